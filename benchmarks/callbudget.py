@@ -0,0 +1,272 @@
+"""
+API call budget check
+
+Counts the HTTP requests each high-level operation sends to the API stand-in and
+fails when one exceeds its budget. Every operation runs against corps of two
+sizes, so a call made per site per item (an N+1 pattern) breaks the budget even
+when the smaller corp fits.
+
+    python benchmarks/callbudget.py [--sites 2 6]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import shutil
+import argparse
+import tempfile
+
+# throughput puts the repo on sys.path
+from throughput import cli, rule_pack_repository
+from pysigsci.standin import StandInServer
+
+EVENTS = 20
+RECORDS = 2500
+LIST_CHANGES = 2500
+
+# items of site-0 the clone copies, for the stand-in's default seed. The built-in
+# agent alert and the templated rule without detections are skipped
+CLONED_ITEMS = {
+    'site-signals': 4, 'rule-lists': 4, 'redactions': 3, 'header-links': 1, 'integrations': 2,
+    'site-rules': 3, 'templated-rules': 0, 'custom-alerts': 4, 'advanced-rules': 1
+}
+
+
+def snapshot(server, sites):
+    """
+    Store a snapshot of every site
+    """
+    from pysigsci import snapshots
+
+    directory = tempfile.mkdtemp(prefix='pysigsci-budget-')
+
+    try:
+        sigsci = server.client()
+        store = snapshots.SnapshotStore(directory)
+
+        for site in sigsci.get_corp_sites()['data']:
+            store.snapshot_site(sigsci, site['name'])
+    finally:
+        shutil.rmtree(directory)
+
+    return 9 * sites + 1
+
+
+def get_config(server, sites):
+    """
+    pysigscia --get-config
+    """
+    cli('pysigscia', ['--get-config'], server)
+    return 9 * sites + 1
+
+
+def all_sites_get(server, sites):
+    """
+    pysigsci --all-sites --get agents
+    """
+    cli('pysigsci', ['--all-sites', '--get', 'agents'], server)
+    return sites + 1
+
+
+def export_requests(server, sites):
+    """
+    Page through a site's requests
+    """
+    sigsci = server.client()
+
+    for _ in sigsci.iter_pages(sigsci.get_requests, {'limit': 1000}):
+        pass
+
+    return -(-RECORDS // 1000)
+
+
+def sync_rule_list(server, sites):
+    """
+    Replace the entries of a rule list
+    """
+    sigsci = server.client()
+    entries = ['10.{}.{}.1'.format(index // 256, index % 256) for index in range(LIST_CHANGES)]
+    sigsci.sync_rule_list('site.list-0', entries)
+    # one GET, then PATCHes of 1000 entries, the generated list has 50 entries to delete
+    return 1 + -(-(LIST_CHANGES + 50) // 1000)
+
+
+def bulk_add(server, sites):
+    """
+    Add ten blacklist entries
+    """
+    from pysigsci import bulk
+
+    entries = [{'source': '192.0.2.{}'.format(index), 'note': 'budget', 'expires': ''}
+               for index in range(10)]
+    list(bulk.bulk_add(server.client(), 'blacklist', entries, workers=2))
+    return 1 + len(entries)
+
+
+def expire_events(server, sites):
+    """
+    Expire all active events of all sites
+    """
+    from pysigsci import bulk
+
+    list(bulk.expire_events(server.client(), workers=2))
+    # one page of active events per site, then one call per event
+    return 1 + sites + sites * EVENTS
+
+
+def clone_site(server, sites):
+    """
+    Copy site-0 to site-1
+    """
+    from pysigsci import clone
+
+    sigsci = server.client()
+    list(clone.clone_site(sigsci, sigsci.clone('site-1'), workers=2))
+    # one GET per config, then one write per copied item
+    return len(CLONED_ITEMS) + sum(CLONED_ITEMS.values())
+
+
+def agent_alerts(server, sites):
+    """
+    Enable agent alerts on all sites twice, the second run has nothing to change
+    """
+    sigsci = server.client()
+    sigsci.enable_agent_alerts_all_sites()
+    sigsci.enable_agent_alerts_all_sites()
+    # each generated site has one disabled agent alert
+    return (1 + 2 * sites) + (1 + sites)
+
+
+def delete_templated_rule(server, sites):
+    """
+    Delete a templated rule that was already fetched
+    """
+    sigsci = server.client()
+    templated_rules = sigsci.get_templated_rules()['data']
+    server.reset_stats()
+
+    for templated_rule in templated_rules:
+        sigsci.delete_templated_rule(templated_rule['name'], templated_rule)
+
+    return len(templated_rules)
+
+
+def dashboard_refresh(server, sites):
+    """
+    Build the corp dashboard, then refresh it within the TTLs
+    """
+    from pysigsci import dashboard
+
+    board = dashboard.Dashboard(server.client())
+    board.refresh()
+    board.refresh()
+    # sites and overview once, then per site top attacks, suspicious IPs and each tag
+    return 2 + sites * (2 + len(dashboard.DEFAULT_TAGS))
+
+
+def deploy_rule_pack(server, sites):
+    """
+    Deploy a rule pack to every site, as pysigsci --power-rules deploy-rule-pack --all-sites
+    The budget includes git updates of the rule pack repo
+    """
+    from pysigsci.powerrules import PowerRules
+
+    directory = tempfile.mkdtemp(prefix='pysigsci-budget-')
+    pack = PowerRules()
+    pack.GIT_URL = rule_pack_repository(directory, 'budget')
+    pack.REPO_DIR = os.path.join(directory, 'clone')
+    update_repo = pack.update_repo
+
+    def counted_update_repo():
+        server.count('GIT', '/api/v0/git-update')
+        update_repo()
+
+    pack.update_repo = counted_update_repo
+
+    try:
+        sigsci = server.client()
+
+        for index in range(sites):
+            sigsci.site = 'site-{}'.format(index)
+            pack.deploy_rule_pack(sigsci, 'budget')
+    finally:
+        shutil.rmtree(directory)
+
+    # three rule files per site, one git update
+    return 3 * sites + 1
+
+
+# (operation, modules it needs)
+OPERATIONS = [
+    (snapshot, []),
+    (get_config, []),
+    (all_sites_get, []),
+    (export_requests, []),
+    (sync_rule_list, []),
+    (bulk_add, []),
+    (expire_events, []),
+    (clone_site, []),
+    (agent_alerts, []),
+    (delete_templated_rule, []),
+    (dashboard_refresh, []),
+    (deploy_rule_pack, ['git'])
+]
+
+
+def missing(modules):
+    """
+    Names of modules that cannot be imported
+    """
+    names = []
+
+    for module in modules:
+        try:
+            __import__(module)
+        except ImportError:
+            names.append(module)
+
+    return names
+
+
+def main():
+    """
+    Check each operation's call count and print a JSON report, exit status 1 when over budget
+    """
+    parser = argparse.ArgumentParser(description='API call budget check.')
+    parser.add_argument('--sites', type=int, nargs='+', default=[2, 6],
+                        help='Corp sizes to run each operation against.')
+    args = parser.parse_args()
+
+    report = []
+    failed = False
+
+    for operation, modules in OPERATIONS:
+        if missing(modules):
+            report.append({'name': operation.__name__, 'skipped': missing(modules)})
+            continue
+
+        for sites in args.sites:
+            server = StandInServer(sites=sites, events=EVENTS, requests=RECORDS).start()
+
+            try:
+                server.reset_stats()
+                budget = operation(server, sites)
+                calls = sum(server.stats.values())
+                result = {'name': operation.__name__, 'sites': sites, 'calls': calls,
+                          'budget': budget, 'ok': calls <= budget}
+
+                if not result['ok']:
+                    result['endpoints'] = server.stats
+            finally:
+                server.stop()
+
+            failed = failed or not result['ok']
+            report.append(result)
+
+    print(json.dumps(report, indent=4))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""
+CLI startup benchmark
+
+Runs the entry points with -X importtime and fails when --help loads a module
+that only an action should need, or when the imports it adds to a bare
+"import pysigsci" take more than budget-ratio times as long as that import.
+The ratio, unlike a time, does not depend on the machine running it.
+
+    python benchmarks/startup.py [--runs 5] [--budget-ratio 1.5]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules no entry point needs for --help
+HEAVY = ['requests', 'deepdiff', 'multiprocessing', 'pysigsci.sigsciapi', 'pysigsci.bulk']
+
+# (script, arguments, modules that must not be imported)
+CASES = [
+    ('pysigsci/bin/pysigsci', ['--help'], HEAVY + ['pysigsci.powerrules']),
+    ('pysigsci/bin/pysigscia', ['--help'], HEAVY + ['pysigsci.snapshots'])
+]
+
+# pysigsci with the standard modules every entry point needs
+BASELINE = ['-c', 'import pysigsci, argparse, json']
+
+
+def import_times(arguments):
+    """
+    Returns {module: microseconds spent importing it, without its imports} for one run
+    of python. site is skipped, so .pth files of the environment are not measured
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    process = subprocess.Popen([sys.executable, '-S', '-X', 'importtime'] + arguments,
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    _, stderr = process.communicate()
+    times = {}
+
+    for line in stderr.decode('utf-8', 'replace').splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+
+        own, _, name = line[len('import time:'):].split('|')
+        times[name.strip()] = int(own)
+
+    return times
+
+
+def median(values):
+    """
+    Median of a list of numbers
+    """
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def total(times, exclude=()):
+    """
+    Microseconds of a run's imports, except the modules in exclude
+    """
+    return sum(micros for name, micros in times.items() if name not in exclude)
+
+
+def main():
+    """
+    Benchmark each case and print a JSON report, exit status 1 on a regression
+    """
+    parser = argparse.ArgumentParser(description='CLI startup benchmark.')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ratio', type=float, default=1.5,
+                        help='Maximum median time of the imports added to the baseline, '
+                             'as a multiple of the baseline.')
+    args = parser.parse_args()
+
+    baseline_runs = [import_times(BASELINE) for _ in range(args.runs)]
+    baseline = median(total(times) for times in baseline_runs)
+    baseline_modules = set(name for times in baseline_runs for name in times)
+    report = []
+    failed = False
+
+    for script, arguments, forbidden in CASES:
+        runs = [import_times([os.path.join(ROOT, script)] + arguments)
+                for _ in range(args.runs)]
+        added = median(total(times, baseline_modules) for times in runs)
+        loaded = sorted(set(name for times in runs for name in times if name in forbidden))
+        result = {
+            'name': 'startup {} {}'.format(os.path.basename(script), ' '.join(arguments)),
+            'runs': args.runs,
+            'baseline_ms': round(baseline / 1000.0, 2),
+            'added_ms': round(added / 1000.0, 2),
+            'ratio': round(float(added) / baseline, 2) if baseline else None,
+            'forbidden_imports': loaded
+        }
+        result['ok'] = not loaded and (not baseline or result['ratio'] <= args.budget_ratio)
+        failed = failed or not result['ok']
+        report.append(result)
+
+    print(json.dumps(report, indent=4))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
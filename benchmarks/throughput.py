@@ -0,0 +1,531 @@
+"""
+Client and CLI throughput benchmark
+
+Runs offline against the API stand-in and prints a JSON report. With --baseline,
+exits 1 when a case is slower than the baseline report by more than --tolerance.
+
+    python benchmarks/throughput.py [--quick] [--output FILE] [--baseline FILE]
+"""
+
+from __future__ import print_function
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import argparse
+import tempfile
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import pysigsci  # noqa: E402 pylint: disable=wrong-import-position
+from pysigsci.standin import StandInServer  # noqa: E402 pylint: disable=wrong-import-position
+
+# (number of calls, records per export, site counts, runs) for full and --quick runs
+SIZES = {
+    'full': {'calls': 500, 'records': 50000, 'sites': [1, 10, 50], 'runs': 5},
+    'quick': {'calls': 100, 'records': 5000, 'sites': [1, 5], 'runs': 2}
+}
+
+# simulated API round trip for the fan-out, snapshot and deploy cases
+LATENCY = 0.005
+
+
+def median(values):
+    """
+    Median of a list of numbers
+    """
+    values = sorted(values)
+    return values[len(values) // 2]
+
+
+def result(name, seconds, **extra):
+    """
+    A report entry, seconds is the value compared against baselines
+    """
+    entry = {'name': name, 'seconds': round(seconds, 6)}
+    entry.update(extra)
+    return entry
+
+
+def cli(script, arguments, server):
+    """
+    Run a CLI tool against a server, returns the wall time in seconds
+    """
+    env = dict(os.environ, PYTHONPATH=ROOT, SIGSCI_API_URL=server.url, SIGSCI_CORP='testcorp',
+               SIGSCI_SITE='site-0', SIGSCI_EMAIL='bench@example.com', SIGSCI_API_TOKEN='bench')
+    env.pop('SIGSCI_PASSWORD', None)
+    started = time.time()
+    process = subprocess.Popen([sys.executable, os.path.join(ROOT, 'pysigsci', 'bin', script)] +
+                               arguments, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+    _, stderr = process.communicate()
+
+    if process.returncode:
+        raise RuntimeError('{} failed: {}'.format(script, stderr.decode('utf-8', 'replace')))
+
+    return time.time() - started
+
+
+def bench_make_request(sizes):
+    """
+    Per call time of SigSciApi against a bare requests session, with and without hooks
+    """
+    import requests
+    from pysigsci import metrics
+
+    server = StandInServer().start()
+
+    try:
+        sigsci = server.client()
+        url = '{}v0/corps/testcorp'.format(server.url)
+        session = requests.Session()
+        calls = sizes['calls']
+
+        def per_call(function):
+            runs = []
+
+            for _ in range(sizes['runs']):
+                started = time.time()
+
+                for _ in range(calls):
+                    function()
+
+                runs.append((time.time() - started) / calls)
+
+            return median(runs)
+
+        raw = per_call(lambda: session.get(url).json())
+        client = per_call(sigsci.get_corp)
+        sigsci.add_request_hook(post=metrics.LatencyHistogram().observe)
+        hooked = per_call(sigsci.get_corp)
+    finally:
+        server.stop()
+
+    return [result('make_request per call', client, calls=calls,
+                   overhead_ms=round((client - raw) * 1000, 3), raw_ms=round(raw * 1000, 3),
+                   hooked_ms=round(hooked * 1000, 3))]
+
+
+def bench_transports(sizes):
+    """
+    Per call time and concurrent fan-out time for each transport, with connections opened
+    """
+    from multiprocessing.pool import ThreadPool
+    from pysigsci.sigsciapi import TRANSPORTS, create_transport
+
+    results = []
+
+    for name in sorted(TRANSPORTS):
+        try:
+            create_transport(name).close()
+        except ImportError as error:
+            results.append(result('transport {}'.format(name), 0.0, skipped=str(error)))
+            continue
+
+        server = StandInServer().start()
+
+        try:
+            sigsci = server.client()
+            sigsci.transport = name
+            calls = sizes['calls']
+            runs = []
+
+            for _ in range(sizes['runs']):
+                started = time.time()
+
+                for _ in range(calls):
+                    sigsci.get_corp()
+
+                runs.append((time.time() - started) / calls)
+
+            # concurrent calls with a simulated round trip, as in --all-sites fan-out
+            server.latency = LATENCY
+            server.reset_stats()
+            pool = ThreadPool(16)
+            started = time.time()
+            pool.map(lambda index: sigsci.clone().get_corp(), range(calls))
+            concurrent = time.time() - started
+            pool.close()
+            sigsci.transport.close()
+        finally:
+            server.stop()
+
+        results.append(result('transport {}'.format(name), median(runs), calls=calls,
+                              concurrent_seconds=round(concurrent, 6),
+                              connections=server.outcomes['connections']))
+
+    return results
+
+
+def bench_hedging(sizes):
+    """
+    Request search latency with a slow tail, with and without hedging
+    """
+    from pysigsci.sigsciapi import HedgingTransport
+
+    results = []
+
+    for name, hedged in [('unhedged', False), ('hedged', True)]:
+        server = StandInServer(sites=1, requests=100, latency=LATENCY).start()
+        server.slow_rate = 0.05
+        server.slow_latency = LATENCY * 20
+
+        try:
+            sigsci = server.client()
+            transport = HedgingTransport(quantile=0.9, budget=0.1) if hedged else None
+            sigsci.transport = transport
+            calls = sizes['calls'] * 2
+            latencies = []
+
+            for _ in range(calls):
+                started = time.time()
+                sigsci.get_requests({'limit': 100})
+                latencies.append(time.time() - started)
+        finally:
+            server.stop()
+
+        latencies.sort()
+        extra = transport.stats() if hedged else {}
+        results.append(result('request search {}'.format(name), sum(latencies) / calls,
+                              calls=calls,
+                              p50_ms=round(latencies[calls // 2] * 1000, 3),
+                              p95_ms=round(latencies[calls * 95 // 100] * 1000, 3),
+                              p99_ms=round(latencies[calls * 99 // 100] * 1000, 3),
+                              hedge_rate=extra.get('hedge_rate'),
+                              win_rate=extra.get('win_rate')))
+
+    return results
+
+
+def bench_exports(sizes):
+    """
+    Records per second exported with iter_pages, for requests, feed and events
+    """
+    records = sizes['records']
+    server = StandInServer(sites=1, requests=records, events=records).start()
+    results = []
+
+    try:
+        sigsci = server.client()
+
+        exports = [('requests', sigsci.get_requests, {'limit': 1000}),
+                   ('feed', sigsci.get_request_feed, {'limit': 1000}),
+                   ('events', sigsci.get_events, {'limit': 1000})]
+
+        for name, method, parameters in exports:
+            runs = []
+
+            for _ in range(sizes['runs']):
+                started = time.time()
+                count = sum(len(page['data'])
+                            for page in sigsci.iter_pages(method, parameters))
+                runs.append(time.time() - started)
+
+            seconds = median(runs)
+            results.append(result('export {}'.format(name), seconds, records=count,
+                                  records_per_second=round(count / seconds, 1)))
+    finally:
+        server.stop()
+
+    return results
+
+
+def bench_fan_out(sizes):
+    """
+    pysigsci --all-sites wall time by number of sites
+    """
+    results = []
+
+    for sites in sizes['sites']:
+        server = StandInServer(sites=sites, latency=LATENCY).start()
+
+        try:
+            seconds = median([cli('pysigsci', ['--all-sites', '--get', 'agents'], server)
+                              for _ in range(sizes['runs'])])
+        finally:
+            server.stop()
+
+        results.append(result('all-sites fan-out {} sites'.format(sites), seconds, sites=sites,
+                              per_site=round(seconds / sites, 6)))
+
+    return results
+
+
+def bench_snapshots(sizes):
+    """
+    pysigscia --snapshot and --diff-snapshots wall time by number of sites
+    """
+    results = []
+
+    for sites in sizes['sites']:
+        server = StandInServer(sites=sites, latency=LATENCY).start()
+        directory = tempfile.mkdtemp(prefix='pysigsci-bench-')
+
+        try:
+            snapshot = median([cli('pysigscia', ['--snapshot', '--snapshot-dir', directory],
+                                   server) for _ in range(sizes['runs'])])
+            diff = median([cli('pysigscia', ['--diff-snapshots', 'site-0',
+                                             'site-{}'.format(sites - 1),
+                                             '--snapshot-dir', directory], server)
+                           for _ in range(sizes['runs'])])
+        finally:
+            server.stop()
+            shutil.rmtree(directory)
+
+        results.append(result('snapshot {} sites'.format(sites), snapshot, sites=sites))
+        results.append(result('diff snapshots {} sites'.format(sites), diff, sites=sites))
+
+    return results
+
+
+def bench_timeseries(sizes):
+    """
+    Timeseries fetch time by number of sites, and aggregation time with numpy and array columns
+    """
+    from pysigsci import timeseries
+
+    tags = ['SQLI', 'XSS', 'CMDEXE', 'TRAVERSAL']
+    results = []
+
+    for sites in sizes['sites']:
+        server = StandInServer(sites=sites, latency=LATENCY).start()
+
+        try:
+            sigsci = server.client()
+            seconds = median([_timed(timeseries.fetch, sigsci, tags, start='-1d')
+                              for _ in range(sizes['runs'])])
+        finally:
+            server.stop()
+
+        results.append(result('timeseries fetch {} sites'.format(sites), seconds, sites=sites,
+                              calls=sites * len(tags)))
+
+    # a day of minutes for 4 tags on the largest number of sites
+    start = 1600000000
+    series = dict(((site, tag), {'from': start, 'inc': 60,
+                                 'data': [(site * 7 + minute) % 5000 for minute in range(1440)]})
+                  for site in range(max(sizes['sites'])) for tag in tags)
+
+    for name, use_numpy in [('numpy', True), ('array', False)]:
+        if use_numpy and timeseries.numpy_module() is None:
+            results.append(result('timeseries aggregate numpy', 0.0, skipped='numpy not installed'))
+            continue
+
+        def aggregate():
+            aligned = timeseries.Timeseries.from_series(series, use_numpy)
+            aligned.sum_sites().resample(600).rate(60)
+            aligned.rolling(15, 'mean')
+
+        seconds = median([_timed(aggregate) for _ in range(sizes['runs'])])
+        results.append(result('timeseries aggregate {}'.format(name), seconds,
+                              columns=len(series), points=1440))
+
+    return results
+
+
+def bench_dashboard(sizes):
+    """
+    Dashboard refresh time by number of sites, cold and within the TTLs
+    """
+    from pysigsci import dashboard
+
+    results = []
+
+    for sites in sizes['sites']:
+        server = StandInServer(sites=sites, latency=LATENCY).start()
+
+        try:
+            board = dashboard.Dashboard(server.client())
+            cold = _timed(board.refresh)
+            server.reset_stats()
+            warm = median([_timed(board.refresh) for _ in range(sizes['runs'])])
+            warm_calls = sum(server.stats.values())
+        finally:
+            server.stop()
+
+        results.append(result('dashboard refresh {} sites'.format(sites), cold, sites=sites,
+                              cached_seconds=round(warm, 6), cached_calls=warm_calls))
+
+    return results
+
+
+def _timed(function, *args, **kwargs):
+    started = time.time()
+    function(*args, **kwargs)
+    return time.time() - started
+
+
+def rule_pack_repository(directory, rulepack):
+    """
+    Create a local origin repository holding a small rule pack, returns its path
+    """
+    origin = os.path.join(directory, 'origin')
+    pack = os.path.join(origin, 'power-rules-{}'.format(rulepack))
+    os.makedirs(pack)
+    files = {
+        'custom-signals.json': {'shortName': 'bench-signal', 'description': 'Benchmark'},
+        'rule-lists.json': {'name': 'bench-list', 'type': 'ip', 'entries': ['10.0.0.1']},
+        'request-rules.json': {'type': 'request', 'enabled': True, 'groupOperator': 'all',
+                               'conditions': [{'type': 'single', 'field': 'ip',
+                                               'operator': 'equals', 'value': '10.0.0.1'}],
+                               'actions': [{'type': 'block'}]}
+    }
+
+    for name, content in files.items():
+        with open(os.path.join(pack, name), 'w') as outfile:
+            json.dump(content, outfile)
+
+    for command in [['init', '-q'], ['add', '.'],
+                    ['-c', 'user.name=bench', '-c', 'user.email=bench@example.com',
+                     'commit', '-q', '-m', 'Rule pack']]:
+        subprocess.check_call(['git'] + command, cwd=origin)
+
+    return origin
+
+
+def bench_power_rules(sizes):
+    """
+    Rule pack deploy time by number of sites, as pysigsci --power-rules deploy-rule-pack
+    """
+    try:
+        from pysigsci.powerrules import PowerRules
+        import git  # noqa: F401 pylint: disable=unused-import,unused-variable
+    except ImportError as error:
+        return [result('power-rule deploy', 0.0, skipped=str(error))]
+
+    results = []
+    directory = tempfile.mkdtemp(prefix='pysigsci-bench-')
+
+    try:
+        pack = PowerRules()
+        pack.GIT_URL = rule_pack_repository(directory, 'bench')
+        pack.REPO_DIR = os.path.join(directory, 'clone')
+
+        for sites in sizes['sites']:
+            server = StandInServer(sites=sites, latency=LATENCY).start()
+
+            try:
+                sigsci = server.client()
+                started = time.time()
+
+                for index in range(sites):
+                    sigsci.site = 'site-{}'.format(index)
+                    pack.deploy_rule_pack(sigsci, 'bench')
+
+                seconds = time.time() - started
+            finally:
+                server.stop()
+
+            results.append(result('power-rule deploy {} sites'.format(sites), seconds,
+                                  sites=sites, per_site=round(seconds / sites, 6)))
+    finally:
+        shutil.rmtree(directory)
+
+    return results
+
+
+def bench_cold_start(sizes):
+    """
+    Wall time of --help for both CLI tools, including interpreter startup
+    """
+    server = StandInServer()
+    results = []
+
+    try:
+        for script in ['pysigsci', 'pysigscia']:
+            seconds = median([cli(script, ['--help'], server)
+                              for _ in range(max(sizes['runs'], 5))])
+            results.append(result('cold start {}'.format(script), seconds))
+    finally:
+        server.server_close()
+
+    return results
+
+
+BENCHMARKS = [
+    bench_make_request,
+    bench_transports,
+    bench_hedging,
+    bench_exports,
+    bench_fan_out,
+    bench_snapshots,
+    bench_timeseries,
+    bench_dashboard,
+    bench_power_rules,
+    bench_cold_start
+]
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Names of results slower than the same result in a baseline report
+    """
+    previous = dict((entry['name'], entry) for entry in baseline['results'])
+    slower = []
+
+    for entry in results:
+        before = previous.get(entry['name'])
+
+        if before is None or 'skipped' in entry or 'skipped' in before:
+            continue
+
+        if entry['seconds'] > before['seconds'] * (1 + tolerance):
+            slower.append(entry['name'])
+
+    return slower
+
+
+def main():
+    """
+    Run the benchmarks and print a JSON report
+    """
+    parser = argparse.ArgumentParser(description='Client and CLI throughput benchmark.')
+    parser.add_argument('--quick', default=False, action='store_true',
+                        help='Smaller data sets and fewer runs.')
+    parser.add_argument('--only', nargs='+', help='Run benchmarks whose name contains these.')
+    parser.add_argument('--output', help='Also write the report to a file.')
+    parser.add_argument('--baseline', help='Report to compare against.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown against the baseline, as a fraction.')
+    args = parser.parse_args()
+
+    sizes = SIZES['quick' if args.quick else 'full']
+    results = []
+
+    for benchmark in BENCHMARKS:
+        name = benchmark.__name__[len('bench_'):]
+
+        if args.only and not [only for only in args.only if only in name]:
+            continue
+
+        results.extend(benchmark(sizes))
+
+    report = {
+        'type': 'benchmark',
+        'version': pysigsci.VERSION,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': int(time.time()),
+        'quick': args.quick,
+        'results': results
+    }
+
+    if args.baseline:
+        with open(args.baseline) as infile:
+            report['regressions'] = regressions(results, json.load(infile), args.tolerance)
+
+    text = json.dumps(report, indent=4)
+    print(text)
+
+    if args.output:
+        with open(args.output, 'w') as outfile:
+            outfile.write(text + '\n')
+
+    sys.exit(1 if report.get('regressions') else 0)
+
+
+if __name__ == '__main__':
+    main()
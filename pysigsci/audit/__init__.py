@@ -0,0 +1,13 @@
+"""
+audit module
+"""
+
+from .audit import SIGSCI_CONFIGS
+from .audit import CONFIG_GETTERS
+from .audit import VOLATILE_FIELDS
+from .audit import DEFAULT_ALERTS
+from .audit import normalize_config
+from .audit import fingerprint_item
+from .audit import load_site_fingerprints
+from .audit import drift_matrix
+from .audit import drift_matrix_csv
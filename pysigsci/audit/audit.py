@@ -0,0 +1,178 @@
+"""
+Signal Sciences Configuration Audit Module
+"""
+
+import os
+import json
+import hashlib
+from collections import Counter
+
+SIGSCI_CONFIGS = ['request_rules', 'signal_rules', 'templated_rules', 'advanced_rules',
+                  'redactions', 'custom_signals', 'custom_alerts', 'header_links',
+                  'integrations']
+
+# SigSciApi methods used to retrieve each config
+CONFIG_GETTERS = {
+    'request_rules': 'get_site_rules',
+    'signal_rules': 'get_signal_rules',
+    'templated_rules': 'get_templated_rules',
+    'advanced_rules': 'get_advanced_rules',
+    'redactions': 'get_redactions',
+    'custom_signals': 'get_custom_signals',
+    'custom_alerts': 'get_custom_alerts',
+    'header_links': 'get_header_links',
+    'integrations': 'get_integrations'
+}
+
+# Fields that differ between sites even when the configuration is the same
+VOLATILE_FIELDS = ['id', 'createdBy', 'updated', 'created']
+NESTED_FIELDS = ['detections', 'alerts']
+
+# Alerts every site has, built in rather than configured
+DEFAULT_ALERTS = ['requests_total', 'agent_scoreboards']
+
+# Below this many sites a process pool costs more than it saves
+POOL_THRESHOLD = 16
+
+
+def normalize_config(data):
+    """
+    Return a copy of a config item list with site specific fields removed
+    """
+    if data is None:
+        return []
+
+    normalized = []
+
+    for item in data:
+        if not isinstance(item, dict):
+            normalized.append(item)
+            continue
+
+        item = dict((key, value) for key, value in item.items()
+                    if key not in VOLATILE_FIELDS)
+
+        # for templated rules
+        for field in NESTED_FIELDS:
+            if isinstance(item.get(field), list):
+                item[field] = normalize_config(item[field])
+
+        normalized.append(item)
+
+    return normalized
+
+
+def fingerprint_item(item):
+    """
+    Return a content hash for a normalized config item
+    """
+    canonical = json.dumps(item, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+def load_site_fingerprints(task):
+    """
+    Normalize and fingerprint all configs for one site from the audit directory
+    task is a tuple of (site, configs, directory) so it can be used with a process pool
+    Configs without a file in the directory are None
+    """
+    site, configs, directory = task
+    fingerprints = {}
+
+    for config in configs:
+        path = '{}/{}.{}.json'.format(directory, site, config)
+
+        if not os.path.exists(path):
+            fingerprints[config] = None
+            continue
+
+        with open(path, 'r') as infile:
+            items = normalize_config(json.load(infile).get('data'))
+
+        fingerprints[config] = sorted(fingerprint_item(item) for item in items)
+
+    return site, fingerprints
+
+
+def drift_matrix(sites, baseline, configs=None, directory='/tmp/pysigsci/audit',
+                 processes=None):
+    """
+    Compare every site to a baseline site in a single pass over the audit directory
+    Returns drift counts per site and config, and the groups of sites sharing a config
+    Configs missing from the directory, for the site or the baseline, have a count of
+    None and are listed per site in missing
+    """
+    if configs is None:
+        configs = SIGSCI_CONFIGS
+
+    if baseline not in sites:
+        sites = [baseline] + list(sites)
+
+    tasks = [(site, configs, directory) for site in sites]
+
+    if processes == 1 or len(tasks) < POOL_THRESHOLD:
+        results = [load_site_fingerprints(task) for task in tasks]
+    else:
+        import multiprocessing
+
+        pool = multiprocessing.Pool(processes)
+        try:
+            results = pool.map(load_site_fingerprints, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+    fingerprints = dict(results)
+    baseline_counts = dict((config, Counter(fingerprints[baseline][config]))
+                           for config in configs if fingerprints[baseline][config] is not None)
+    matrix = {}
+    missing = {}
+    groups = dict((config, {}) for config in configs)
+
+    for site, site_fingerprints in results:
+        row = {}
+
+        for config in configs:
+            hashes = site_fingerprints[config]
+
+            if hashes is None:
+                missing.setdefault(site, []).append(config)
+
+            if hashes is None or config not in baseline_counts:
+                row[config] = None
+                continue
+
+            counts = Counter(hashes)
+            drift = (counts - baseline_counts[config]) + (baseline_counts[config] - counts)
+            row[config] = sum(drift.values())
+
+            digest = fingerprint_item(hashes)
+            groups[config].setdefault(digest, []).append(site)
+
+        matrix[site] = row
+
+    return {
+        'baseline': baseline,
+        'configs': list(configs),
+        'sites': matrix,
+        'missing': missing,
+        'groups': dict((config, sorted(groups[config].values(), key=len, reverse=True))
+                       for config in configs)
+    }
+
+
+def drift_matrix_csv(matrix):
+    """
+    Render a drift matrix as CSV, one row per site
+    """
+    lines = [','.join(['site'] + matrix['configs'] + ['total'])]
+
+    for site in sorted(matrix['sites']):
+        row = matrix['sites'][site]
+        counts = [row[config] for config in matrix['configs']]
+        # configs that were not compared are empty cells
+        cells = ['' if count is None else str(count) for count in counts]
+        total = sum(count for count in counts if count is not None)
+        lines.append(','.join([site] + cells + [str(total)]))
+
+    return '\n'.join(lines)
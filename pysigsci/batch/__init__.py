@@ -0,0 +1,8 @@
+"""
+batch module
+"""
+
+from .batch import VERBS
+from .batch import parse_operation
+from .batch import run_operation
+from .batch import run_batch
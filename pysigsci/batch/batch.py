@@ -0,0 +1,133 @@
+"""
+Signal Sciences Batch Operations
+"""
+
+import json
+from collections import deque
+from multiprocessing.pool import ThreadPool
+from pysigsci.sigsciapi import parse_time_delta
+
+# verbs map to client methods, e.g. get rule-lists -> get_rule_lists
+VERBS = ['get', 'add', 'update', 'delete', 'enable', 'disable', 'expire', 'generate']
+
+
+def parse_operation(line):
+    """
+    Parse one operation spec, a JSON object per line, e.g.
+    {"verb": "get", "resource": "rule-lists", "site": "www"}
+    {"verb": "update", "resource": "site-rule", "id": "5e...", "data": {...}}
+    {"verb": "get", "resource": "events", "params": {"from": "-1h", "tag": "SQLI"}}
+    Returns None for blank and comment lines
+    """
+    line = line.strip()
+
+    if not line or line.startswith('#'):
+        return None
+
+    operation = json.loads(line)
+
+    if not isinstance(operation, dict):
+        raise ValueError('Operation must be a JSON object')
+
+    if operation.get('verb') not in VERBS:
+        raise ValueError('Unknown verb: {}'.format(operation.get('verb')))
+
+    if not operation.get('resource'):
+        raise ValueError('Operation requires a resource')
+
+    return operation
+
+
+def run_operation(client, operation):
+    """
+    Run one operation with the client, arguments are passed the way the CLI passes them
+    """
+    if operation.get('site'):
+        client.site = operation['site']
+
+    method = getattr(client, '{}_{}'.format(operation['verb'],
+                                            operation['resource'].replace('-', '_')))
+    params = dict(operation.get('params') or {})
+    identifier = operation.get('id')
+
+    # relative times, e.g. -1h, are converted like --from-time and --until-time
+    for field in ['from', 'until']:
+        if field in params and parse_time_delta(str(params[field])):
+            params[field] = parse_time_delta(str(params[field]))
+
+    if params:
+        return method(parameters=params)
+
+    if 'data' in operation:
+        if identifier is not None:
+            return method(identifier, data=operation['data'])
+        return method(data=operation['data'])
+
+    if identifier is not None:
+        return method(identifier)
+
+    return method()
+
+
+def run_batch(sigsci, lines, workers=None, ordered=False):
+    """
+    Run newline delimited operation specs concurrently over one authenticated client
+    Lines are read lazily, at most two per worker are in flight, so input can be
+    streamed from stdin
+    Yields a result per operation tagged with its line number, in completion order,
+    or input order when ordered is set
+    """
+    try:
+        from queue import Queue
+    except ImportError:
+        from Queue import Queue
+
+    def run(task):
+        number, line = task
+        result = {'line': number}
+
+        try:
+            operation = parse_operation(line)
+
+            if operation is None:
+                return None
+
+            result['result'] = run_operation(sigsci.clone(), operation)
+        except Exception as error:
+            result['error'] = str(error)
+
+        return result
+
+    workers = workers or sigsci.workers
+    window = workers * 2
+    # ordered keeps the pending results in input order, unordered takes them as they complete
+    pending = deque()
+    done = Queue()
+    callback = None if ordered else done.put
+    pool = ThreadPool(workers)
+
+    def next_result():
+        if ordered:
+            return pending.popleft().get()
+
+        pending.popleft()
+        return done.get()
+
+    try:
+        for task in enumerate(lines, 1):
+            pending.append(pool.apply_async(run, (task,), callback=callback))
+
+            if len(pending) >= window:
+                result = next_result()
+
+                if result is not None:
+                    yield result
+
+        while pending:
+            result = next_result()
+
+            if result is not None:
+                yield result
+    finally:
+        pool.close()
+        pool.join()
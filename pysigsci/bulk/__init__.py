@@ -0,0 +1,11 @@
+"""
+bulk module
+"""
+
+from .bulk import LIST_TYPES
+from .bulk import read_list_entries
+from .bulk import bulk_add
+from .bulk import bulk_delete
+from .bulk import prune_expired
+from .bulk import select_events
+from .bulk import expire_events
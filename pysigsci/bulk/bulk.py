@@ -0,0 +1,369 @@
+"""
+Signal Sciences Bulk Operations
+"""
+
+import re
+import json
+import time
+import datetime
+import threading
+from multiprocessing.pool import ThreadPool
+from pysigsci.ipset import IPSet
+from pysigsci.sigsciapi import response_error
+
+LIST_TYPES = ['blacklist', 'whitelist']
+
+# the +hh:mm or -hh:mm offset at the end of an RFC3339 timestamp
+UTC_OFFSET = re.compile(r'([+-])(\d{2}):?(\d{2})$')
+
+
+def read_list_entries(source, note=None, expires=None):
+    """
+    Returns blacklist/whitelist entries from an iterable or a file path
+    Each entry is a dict, a JSON object per line, or a "source[,note[,expires]]" line
+    note and expires are defaults for entries that do not set them
+    """
+    if isinstance(source, str):
+        with open(source, 'r') as infile:
+            source = infile.read().splitlines()
+
+    entries = []
+
+    for line in source:
+        if isinstance(line, dict):
+            entry = dict(line)
+        else:
+            line = line.strip()
+
+            if not line or line.startswith('#'):
+                continue
+
+            if line.startswith('{'):
+                entry = json.loads(line)
+            else:
+                fields = [field.strip() for field in line.split(',')]
+                entry = {'source': fields[0]}
+
+                if len(fields) > 1 and fields[1]:
+                    entry['note'] = fields[1]
+                if len(fields) > 2 and fields[2]:
+                    entry['expires'] = fields[2]
+
+        entry.setdefault('note', note or 'Added by pysigsci')
+
+        if expires is not None:
+            entry.setdefault('expires', expires)
+
+        entries.append(entry)
+
+    return entries
+
+
+def parse_expires(expires):
+    """
+    Parse an entry's expires timestamp (RFC3339), returns it in UTC without a timezone
+    or None if not set
+    """
+    if not expires:
+        return None
+
+    offset = datetime.timedelta(0)
+    match = UTC_OFFSET.search(expires)
+
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = datetime.timedelta(hours=int(hours), minutes=int(minutes))
+        offset = -offset if sign == '-' else offset
+        expires = expires[:match.start()]
+
+    expires = expires.rstrip('Zz')
+
+    for time_format in ['%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S']:
+        try:
+            return datetime.datetime.strptime(expires, time_format) - offset
+        except ValueError:
+            pass
+
+    return None
+
+
+def _run(sigsci, func, items, workers):
+    """
+    Apply func(client, item) through a bounded pool, yielding results as they complete
+    Requests share the client's session, so 429 responses pause every worker
+    """
+    if not items:
+        return
+
+    def call(item):
+        try:
+            return func(sigsci.clone(), item)
+        except Exception as error:
+            return dict(item, status='error', message=str(error))
+
+    pool = ThreadPool(min(workers or sigsci.workers, len(items)))
+    try:
+        for result in pool.imap_unordered(call, items):
+            yield result
+    finally:
+        pool.close()
+        pool.join()
+
+
+def _outcome(entry, response, status):
+    outcome = {'source': entry['source'], 'status': status}
+
+    if response_error(response) is not None:
+        outcome.update({'status': 'error', 'message': response_error(response)})
+
+    return outcome
+
+
+def bulk_add(sigsci, list_type, entries, workers=None):
+    """
+    Add entries to the site blacklist or whitelist
+    The list is fetched once, entries already covered by it are skipped
+    Yields an outcome per entry in input order: added, exists, duplicate or error
+    A duplicate's first is the input position of the entry it repeats
+    """
+    current = getattr(sigsci, 'get_{}'.format(list_type))().get('data') or []
+    existing = IPSet()
+    sources = set(item['source'] for item in current)
+    first = {}
+    outcomes = {}
+    pending = []
+
+    for item in current:
+        try:
+            existing.add(item['source'])
+        except ValueError:
+            pass
+
+    for position, entry in enumerate(entries):
+        try:
+            covered = entry['source'] in sources or entry['source'] in existing
+        except ValueError as error:
+            outcomes[position] = {'source': entry['source'], 'status': 'error',
+                                  'message': str(error)}
+            continue
+
+        if entry['source'] in first:
+            outcomes[position] = {'source': entry['source'], 'status': 'duplicate',
+                                  'first': first[entry['source']]}
+        elif covered:
+            outcomes[position] = {'source': entry['source'], 'status': 'exists'}
+        else:
+            pending.append((position, entry))
+            first[entry['source']] = position
+
+    def add(client, item):
+        position, entry = item
+
+        try:
+            response = getattr(client, 'add_{}'.format(list_type))(entry)
+        except Exception as error:
+            return position, {'source': entry['source'], 'status': 'error', 'message': str(error)}
+
+        return position, _outcome(entry, response, 'added')
+
+    # outcomes are held until every earlier entry has one
+    results = _run(sigsci, add, pending, workers)
+    next_position = 0
+
+    while True:
+        while next_position in outcomes:
+            yield outcomes.pop(next_position)
+            next_position += 1
+
+        try:
+            position, outcome = next(results)
+        except StopIteration:
+            break
+
+        outcomes[position] = outcome
+
+
+def bulk_delete(sigsci, list_type, entries, workers=None, current=None):
+    """
+    Delete entries from the site blacklist or whitelist by source
+    Yields an outcome per entry: deleted, missing or error
+    """
+    if current is None:
+        current = getattr(sigsci, 'get_{}'.format(list_type))().get('data') or []
+
+    identifiers = dict((item['source'], item['id']) for item in current)
+    pending = []
+
+    for entry in entries:
+        if entry['source'] in identifiers:
+            pending.append(dict(entry, id=identifiers.pop(entry['source'])))
+        else:
+            yield {'source': entry['source'], 'status': 'missing'}
+
+    def delete(client, entry):
+        response = getattr(client, 'delete_{}'.format(list_type))(entry['id'])
+        return _outcome(entry, response, 'deleted')
+
+    for outcome in _run(sigsci, delete, pending, workers):
+        yield outcome
+
+
+def prune_expired(sigsci, list_type, now=None, workers=None, dry_run=False):
+    """
+    Delete blacklist or whitelist entries whose expires time has passed
+    Yields an outcome per expired entry
+    """
+    if now is None:
+        now = datetime.datetime.utcnow()
+
+    current = getattr(sigsci, 'get_{}'.format(list_type))().get('data') or []
+    expired = [item for item in current
+               if parse_expires(item.get('expires')) is not None and
+               parse_expires(item.get('expires')) <= now]
+
+    if dry_run:
+        for item in expired:
+            yield {'source': item['source'], 'status': 'expired', 'expires': item['expires']}
+        return
+
+    for outcome in bulk_delete(sigsci, list_type, expired, workers, current):
+        yield outcome
+
+
+def prefetch(iterable, size=1):
+    """
+    Iterate in a background thread, keeping up to size items ready ahead of the consumer
+    e.g. the next page of results is requested while the current one is processed
+    """
+    try:
+        from queue import Queue
+    except ImportError:
+        from Queue import Queue
+
+    items = Queue(size)
+    done = object()
+
+    def produce():
+        try:
+            for item in iterable:
+                items.put((item, None))
+        except Exception as error:
+            items.put((None, error))
+        items.put((done, None))
+
+    thread = threading.Thread(target=produce)
+    thread.daemon = True
+    thread.start()
+
+    while True:
+        item, error = items.get()
+
+        if error is not None:
+            raise error
+
+        if item is done:
+            return
+
+        yield item
+
+
+def select_events(sigsci, signal=None, source_ip=None, from_time=None, until_time=None):
+    """
+    Returns the active events for the client's site matching all given filters
+    Pages are requested ahead while the previous page is filtered
+    """
+    parameters = {'status': 'active'}
+
+    if signal is not None:
+        parameters['tag'] = signal
+    if source_ip is not None:
+        parameters['ip'] = source_ip
+    if from_time is not None:
+        parameters['from'] = from_time
+    if until_time is not None:
+        parameters['until'] = until_time
+
+    events = []
+
+    for page in prefetch(sigsci.iter_pages(sigsci.get_events, parameters)):
+        for event in page.get('data') or []:
+            if source_ip is not None and event.get('source', source_ip) != source_ip:
+                continue
+            if signal is not None and signal not in (event.get('reasons') or {signal: 1}):
+                continue
+
+            events.append(event)
+
+    return events
+
+
+def expire_events(sigsci, sites=None, signal=None, source_ip=None, from_time=None,
+                  until_time=None, dry_run=False, workers=None):
+    """
+    Expire active events matching the filters, across sites (default all sites)
+    Sites are searched concurrently and matches are expired through a bounded pool
+    as soon as each site's search completes. Searching collects a site's matches
+    before expiring them, since expiring shifts the pages of active events
+    Yields an outcome per event, then a summary with throughput
+    """
+    started = time.time()
+    summary = {'type': 'summary', 'sites': 0, 'matched': 0, 'expired': 0, 'errors': 0,
+               'dry_run': dry_run}
+    search_errors = []
+
+    def search(client):
+        return select_events(client, signal, source_ip, from_time, until_time)
+
+    def matches():
+        for site, events, error in sigsci.map_sites(search, sites, workers):
+            summary['sites'] += 1
+
+            if error is not None:
+                search_errors.append({'type': 'event', 'site': site, 'status': 'error',
+                                      'message': str(error)})
+                continue
+
+            for event in events:
+                yield site, event
+
+    def expire(match):
+        site, event = match
+        outcome = {'type': 'event', 'site': site, 'id': event['id'], 'status': 'expired'}
+
+        if dry_run:
+            outcome['status'] = 'matched'
+            return outcome
+
+        try:
+            response = sigsci.clone(site).expire_event(event['id'])
+        except Exception as error:
+            response = {'message': str(error)}
+
+        if response_error(response) is not None:
+            outcome.update({'status': 'error', 'message': response_error(response)})
+
+        return outcome
+
+    pool = ThreadPool(workers or sigsci.workers)
+    try:
+        for outcome in pool.imap_unordered(expire, matches()):
+            summary['matched'] += 1
+
+            if outcome['status'] == 'expired':
+                summary['expired'] += 1
+            elif outcome['status'] == 'error':
+                summary['errors'] += 1
+
+            yield outcome
+    finally:
+        pool.close()
+        pool.join()
+
+    for outcome in search_errors:
+        summary['errors'] += 1
+        yield outcome
+
+    summary['seconds'] = round(time.time() - started, 3)
+    summary['per_second'] = round(summary['expired'] / summary['seconds'], 2) \
+        if summary['seconds'] else 0.0
+    yield summary
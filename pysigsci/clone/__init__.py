@@ -0,0 +1,7 @@
+"""
+clone module
+"""
+
+from .clone import STAGES
+from .clone import remap
+from .clone import clone_site
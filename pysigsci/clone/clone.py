@@ -0,0 +1,166 @@
+"""
+Signal Sciences Site Clone
+"""
+
+import time
+from multiprocessing.pool import ThreadPool
+from pysigsci.audit import normalize_config, DEFAULT_ALERTS
+from pysigsci.sigsciapi import response_error
+
+# Source getters, fetched concurrently
+SOURCE_CONFIGS = {
+    'site-signals': 'get_site_signals',
+    'rule-lists': 'get_site_rule_lists',
+    'site-rules': 'get_site_rules',
+    'templated-rules': 'get_templated_rules',
+    'advanced-rules': 'get_advanced_rules',
+    'custom-alerts': 'get_site_alerts',
+    'redactions': 'get_redactions',
+    'header-links': 'get_header_links',
+    'integrations': 'get_integrations'
+}
+
+# Target adders for items that are written as they were read
+ADDERS = {
+    'rule-lists': 'add_site_rule_lists',
+    'site-rules': 'add_site_rules',
+    'custom-alerts': 'add_site_alert',
+    'redactions': 'add_redactions',
+    'header-links': 'add_header_links',
+    'integrations': 'add_integration'
+}
+
+# Write order, each stage only depends on the ones before it
+STAGES = [
+    ['site-signals', 'rule-lists', 'redactions', 'header-links', 'integrations'],
+    ['site-rules', 'templated-rules', 'custom-alerts'],
+    ['advanced-rules']
+]
+
+
+def remap(value, mapping):
+    """
+    Replace references (signal tag names, rule list ids) in a config item
+    """
+    if isinstance(value, dict):
+        return dict((key, remap(item, mapping)) for key, item in value.items())
+
+    if isinstance(value, list):
+        return [remap(item, mapping) for item in value]
+
+    if isinstance(value, str) and value in mapping:
+        return mapping[value]
+
+    return value
+
+
+def item_name(item):
+    """
+    A readable name for an item in clone outcomes
+    """
+    for field in ['shortName', 'name', 'description', 'longName', 'field', 'url']:
+        if item.get(field):
+            return item[field]
+
+    return item.get('id')
+
+
+def _write(source, target, resource, item):
+    # returns the API response for one item written to the target site
+    if resource == 'site-signals':
+        return target.add_site_signals({'shortName': item['shortName'],
+                                        'description': item.get('description', '')})
+
+    if resource == 'templated-rules':
+        return target.add_templated_rules(item['name'], {
+            'detectionAdds': item.get('detections') or [],
+            'detectionUpdates': [],
+            'detectionDeletes': [],
+            'alertAdds': item.get('alerts') or [],
+            'alertUpdates': [],
+            'alertDeletes': []
+        })
+
+    if resource == 'advanced-rules':
+        # advanced rules can only be copied between sites of the same corp
+        if target.corp == source.corp:
+            return target.copy_advanced_rule(item['name'], source.site)
+        return {'message': 'Advanced rules can not be copied to another corp'}
+
+    return getattr(target, ADDERS[resource])(item)
+
+
+def clone_site(source, target, workers=None):
+    """
+    Copy the configuration of the source client's site to the target client's site
+    The target may be in another corp. Source configs are fetched concurrently,
+    references to signals and rule lists are remapped to the ids created on the
+    target, and each stage is written in parallel
+    Yields an outcome per item, then a summary
+    """
+    started = time.time()
+    workers = workers or source.workers
+    summary = {'type': 'summary', 'source': source.site, 'target': target.site,
+               'copied': 0, 'skipped': 0, 'error': 0}
+
+    def fetch(resource):
+        response = getattr(source.clone(), SOURCE_CONFIGS[resource])()
+        return resource, response.get('data') or []
+
+    pool = ThreadPool(workers)
+    try:
+        config = dict(pool.map(fetch, sorted(SOURCE_CONFIGS)))
+        mapping = {}
+
+        def copy_item(task):
+            stage, resource, item = task
+            outcome = {'type': 'item', 'stage': stage, 'resource': resource,
+                       'name': item_name(item), 'status': 'copied'}
+
+            if resource == 'custom-alerts' and item.get('tagName') in DEFAULT_ALERTS:
+                outcome['status'] = 'skipped'
+                return outcome, None
+
+            if resource == 'templated-rules' and not item.get('detections'):
+                outcome['status'] = 'skipped'
+                return outcome, None
+
+            data = remap(normalize_config([item])[0], mapping)
+
+            try:
+                response = _write(source, target.clone(), resource, data)
+            except Exception as error:
+                response = {'message': str(error)}
+
+            if response_error(response) is not None:
+                outcome.update({'status': 'error', 'message': response_error(response)})
+                return outcome, None
+
+            return outcome, (item, response)
+
+        for stage, resources in enumerate(STAGES, 1):
+            tasks = []
+
+            for resource in resources:
+                for item in config.get(resource) or []:
+                    tasks.append((stage, resource, item))
+
+            for outcome, created in pool.imap_unordered(copy_item, tasks):
+                summary[outcome['status']] = summary.get(outcome['status'], 0) + 1
+
+                # references to signals and lists point at the target's copies
+                if created is not None:
+                    item, response = created
+                    for field in ['id', 'tagName']:
+                        if isinstance(response, dict) and item.get(field) and \
+                                response.get(field) and item[field] != response[field]:
+                            mapping[item[field]] = response[field]
+
+                yield outcome
+    finally:
+        pool.close()
+        pool.join()
+
+    summary['errors'] = summary.pop('error', 0)
+    summary['seconds'] = round(time.time() - started, 3)
+    yield summary
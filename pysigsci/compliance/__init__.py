@@ -0,0 +1,7 @@
+"""
+compliance module
+"""
+
+from .compliance import compliance_report
+from .compliance import site_compliance
+from .compliance import parse_version
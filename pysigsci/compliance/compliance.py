@@ -0,0 +1,158 @@
+"""
+Signal Sciences Agent Version Compliance
+"""
+
+import re
+import threading
+from collections import Counter
+from pysigsci import releases
+
+VERSION = re.compile(r'^v?\d+(\.\d+)+$')
+
+
+def parse_version(version):
+    """
+    Returns a comparable tuple for a version string, e.g. "v4.12.0" -> (4, 12, 0)
+    """
+    return tuple(int(part) for part in re.findall(r'\d+', version or ''))
+
+
+def module_name(module_type):
+    """
+    Returns the releases module name for an agent's module.type, or None
+    e.g. "sigsci-module-nginx-native" -> "nginx-native"
+    """
+    module_type = (module_type or '').lower()
+    matches = [module for module in releases.MODULES
+               if module_type.endswith(module) or 'module-{}'.format(module) in module_type]
+
+    if not matches:
+        return None
+
+    return max(matches, key=len)
+
+
+class LatestVersions(object):
+    """
+    Latest release versions, each fetched at most once and shared between threads
+    Different names are fetched concurrently. A response that is not a version, e.g.
+    an error page, is not kept and the version is None
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.locks = {}
+        self.versions = {}
+
+    def get(self, name):
+        """
+        Returns the latest version for "agent" or a module name, or None
+        """
+        with self.lock:
+            lock = self.locks.setdefault(name, threading.Lock())
+
+        with lock:
+            if name not in self.versions:
+                if name == 'agent':
+                    version = releases.get_latest_agent_version()['agent']
+                else:
+                    version = releases.get_latest_module_version(name)[name]
+
+                if not VERSION.match(version or ''):
+                    return None
+
+                self.versions[name] = version
+
+            return self.versions[name]
+
+
+def site_compliance(agents, latest):
+    """
+    Returns version distributions and outdated counts for a site's agents
+    """
+    agent_versions = Counter()
+    module_versions = Counter()
+    outdated = []
+    agents_outdated = 0
+    modules_outdated = 0
+
+    for agent in agents:
+        agent_version = agent.get('agent.version')
+        module_type = agent.get('module.type')
+        module_version = agent.get('module.version')
+        agent_versions[agent_version] += 1
+        is_outdated = False
+
+        # agents are not counted outdated against an unknown latest version
+        if latest.get('agent') and \
+                parse_version(agent_version) < parse_version(latest['agent']):
+            agents_outdated += 1
+            is_outdated = True
+
+        name = module_name(module_type)
+
+        if name is not None and module_version:
+            module_versions['{} {}'.format(name, module_version)] += 1
+
+            if latest.get(name) and \
+                    parse_version(module_version) < parse_version(latest[name]):
+                modules_outdated += 1
+                is_outdated = True
+
+        if is_outdated:
+            outdated.append(agent.get('agent.name'))
+
+    return {
+        'agents': len(agents),
+        'agent_outdated': agents_outdated,
+        'module_outdated': modules_outdated,
+        'agent_versions': dict(agent_versions),
+        'module_versions': dict(module_versions),
+        'outdated': outdated
+    }
+
+
+def compliance_report(sigsci, sites=None, workers=None):
+    """
+    Fetch agents for all sites concurrently and compare them to the latest releases
+    Yields a record per site as each site completes, then a corp summary record
+    """
+    latest = LatestVersions()
+    summary = {
+        'type': 'summary',
+        'sites': 0,
+        'errors': 0,
+        'agents': 0,
+        'agent_outdated': 0,
+        'module_outdated': 0,
+        'agent_versions': Counter(),
+        'module_versions': Counter()
+    }
+
+    def check_site(client):
+        agents = client.get_agents().get('data') or []
+        needed = ['agent'] + [module_name(agent.get('module.type')) for agent in agents]
+        versions = dict((name, latest.get(name)) for name in set(needed) if name is not None)
+        return site_compliance(agents, versions)
+
+    for site, result, error in sigsci.map_sites(check_site, sites, workers):
+        summary['sites'] += 1
+
+        if error is not None:
+            summary['errors'] += 1
+            yield {'type': 'site', 'site': site, 'error': str(error)}
+            continue
+
+        for field in ['agents', 'agent_outdated', 'module_outdated']:
+            summary[field] += result[field]
+
+        summary['agent_versions'].update(result['agent_versions'])
+        summary['module_versions'].update(result['module_versions'])
+
+        result.update({'type': 'site', 'site': site})
+        yield result
+
+    summary['agent_versions'] = dict(summary['agent_versions'])
+    summary['module_versions'] = dict(summary['module_versions'])
+    summary['latest'] = dict(latest.versions)
+    yield summary
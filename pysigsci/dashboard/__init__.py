@@ -0,0 +1,10 @@
+"""
+dashboard module
+"""
+
+from .dashboard import Dashboard
+from .dashboard import rollup
+from .dashboard import attack_counts
+from .dashboard import suspicious_ip_counts
+from .dashboard import DEFAULT_TAGS
+from .dashboard import TTLS
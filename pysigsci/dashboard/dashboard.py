@@ -0,0 +1,301 @@
+"""
+Signal Sciences Corp Security Dashboard
+"""
+
+import time
+import threading
+from numbers import Integral
+from multiprocessing.pool import ThreadPool
+from pysigsci.sigsciapi import response_error
+from pysigsci import timeseries
+
+# request timeseries tags collected for each site
+DEFAULT_TAGS = ['SQLI', 'XSS', 'CMDEXE', 'TRAVERSAL']
+
+# seconds each endpoint's responses are reused before a refresh fetches them again
+TTLS = {
+    'sites': 300,
+    'overview': 60,
+    'top_attacks': 60,
+    'suspicious_ips': 60,
+    'timeseries': 60
+}
+
+# entries in the top attack type and top IP rollups
+TOP = 10
+
+
+def attack_counts(response):
+    """
+    Returns {tag: count} of a top attacks response
+    """
+    items = response.get('topAttacks') or response.get('data') or []
+    counts = {}
+
+    for item in items:
+        tag = item.get('value') or item.get('tagName') or item.get('type')
+
+        if tag:
+            counts[tag] = counts.get(tag, 0) + (item.get('count') or item.get('tagCount') or 0)
+
+    return counts
+
+
+def suspicious_ip_counts(response):
+    """
+    Returns {ip: count} of a suspicious IPs response, IPs without a count count 1
+    """
+    counts = {}
+
+    for item in response.get('data') or []:
+        if item.get('source'):
+            counts[item['source']] = counts.get(item['source'], 0) + (item.get('count') or 1)
+
+    return counts
+
+
+def _top(counts, top):
+    return sorted(counts.items(), key=lambda item: (-item[1], item[0]))[:top]
+
+
+def rollup(sites, overview, top=TOP):
+    """
+    Returns corp totals and the top attack types and IPs across sites with the sites
+    they were seen on, from {site: {'top_attacks': {tag: count}, 'suspicious_ips':
+    {ip: count}}} and {site: overview report entry}
+    """
+    totals = {'sites': len(sites)}
+
+    for entry in overview.values():
+        for name, value in entry.items():
+            if isinstance(value, Integral) and not isinstance(value, bool):
+                totals[name] = totals.get(name, 0) + value
+
+    rollups = {}
+
+    for name, field in [('top_attack_types', 'top_attacks'), ('top_ips', 'suspicious_ips')]:
+        counts = {}
+        by_site = {}
+
+        for site, data in sites.items():
+            for key, count in (data.get(field) or {}).items():
+                counts[key] = counts.get(key, 0) + count
+                by_site.setdefault(key, {})[site] = count
+
+        rollups[name] = [{'name': key, 'count': count, 'sites': by_site[key]}
+                         for key, count in _top(counts, top)]
+
+        if field == 'suspicious_ips':
+            totals['suspicious_ips'] = len(counts)
+
+    return dict(rollups, totals=totals)
+
+
+class Dashboard(object):
+    """
+    Overview report, top attacks, suspicious IPs and request timeseries of all sites,
+    rolled up for the corp. refresh() fetches the responses older than their endpoint's
+    TTL in one concurrent pass, keeping the previous response when a call fails.
+    snapshot() returns the last good snapshot, also while a refresh runs, and start()
+    refreshes in a background thread
+    """
+
+    def __init__(self, sigsci, sites=None, tags=None, start='-1h', ttls=None, workers=None,
+                 top=TOP):
+        self.sigsci = sigsci
+        self.sites = sites
+        self.tags = list(tags if tags is not None else DEFAULT_TAGS)
+        self.from_time = start
+        self.ttls = dict(TTLS, **(ttls or {}))
+        self.workers = workers or sigsci.workers
+        self.top = top
+        self.lock = threading.Lock()
+        self.refreshing = threading.Lock()
+        self.cache = {}
+        self.errors = {}
+        self.last = None
+        self.stopped = threading.Event()
+        self.thread = None
+
+    def _due(self, job, now):
+        with self.lock:
+            entry = self.cache.get(job)
+
+        return entry is None or now - entry[0] >= self.ttls[job[0]]
+
+    def _call(self, job):
+        endpoint, site, tag = job
+        client = self.sigsci.clone(site) if site is not None else self.sigsci
+
+        if endpoint == 'sites':
+            return client.get_corp_sites()
+
+        if endpoint == 'overview':
+            return client.get_overview_report({'from': self.from_time})
+
+        if endpoint == 'top_attacks':
+            return client.get_top_attacks()
+
+        if endpoint == 'suspicious_ips':
+            return client.get_suspicious_ips()
+
+        return client.get_timeseries_requests({'from': self.from_time, 'tag': tag})
+
+    def _fetch(self, job):
+        try:
+            response = self._call(job)
+            error = response_error(response)
+        except Exception as exception:
+            response, error = None, str(exception)
+
+        return job, response, error
+
+    def _store(self, results):
+        # results may be an iterator still being fetched, so the lock is taken per result
+        for job, response, error in results:
+            with self.lock:
+                if error is None:
+                    self.cache[job] = (time.time(), response)
+                    self.errors.pop(job, None)
+                else:
+                    # the previous response, if any, is kept
+                    self.errors[job] = error
+
+    def _cached(self, job):
+        with self.lock:
+            entry = self.cache.get(job)
+
+        return entry[1] if entry is not None else None
+
+    def site_names(self):
+        """
+        Sites on the dashboard, the given sites or all sites of the corp
+        """
+        if self.sites is not None:
+            return list(self.sites)
+
+        job = ('sites', None, None)
+
+        if self._due(job, time.time()):
+            self._store([self._fetch(job)])
+
+        return [site['name'] for site in (self._cached(job) or {}).get('data', [])]
+
+    def refresh(self):
+        """
+        Fetch the expired responses for all sites concurrently, then build and return a
+        new snapshot. Concurrent refreshes run one at a time
+        """
+        with self.refreshing:
+            started = time.time()
+            sites = self.site_names()
+            jobs = [('overview', None, None)]
+
+            for site in sites:
+                jobs.extend([('top_attacks', site, None), ('suspicious_ips', site, None)])
+                jobs.extend(('timeseries', site, tag) for tag in self.tags)
+
+            due = [job for job in jobs if self._due(job, started)]
+
+            if due:
+                pool = ThreadPool(min(self.workers, len(due)))
+
+                try:
+                    self._store(pool.imap_unordered(self._fetch, due))
+                finally:
+                    pool.close()
+                    pool.join()
+
+            snapshot = self.build(sites)
+            snapshot['fetched'] = len(due)
+            snapshot['seconds'] = round(time.time() - started, 6)
+
+            with self.lock:
+                self.last = snapshot
+
+            return snapshot
+
+    def build(self, sites):
+        """
+        Returns a snapshot of the cached responses for sites
+        """
+        overview = {}
+
+        for entry in (self._cached(('overview', None, None)) or {}).get('data', []):
+            if entry.get('siteName') in sites:
+                overview[entry['siteName']] = entry
+
+        site_data = {}
+        series = {}
+
+        for site in sites:
+            site_data[site] = {
+                'overview': overview.get(site),
+                'top_attacks': attack_counts(self._cached(('top_attacks', site, None)) or {}),
+                'suspicious_ips': suspicious_ip_counts(
+                    self._cached(('suspicious_ips', site, None)) or {})
+            }
+
+            for tag in self.tags:
+                response = self._cached(('timeseries', site, tag))
+                found = timeseries.tag_series(response, tag) if response else None
+
+                if found is not None:
+                    series[(site, tag)] = found
+
+        aligned = timeseries.Timeseries.from_series(series).sum_sites().to_dict()
+        snapshot = rollup(site_data, overview, self.top)
+
+        with self.lock:
+            errors = [{'endpoint': endpoint, 'site': site, 'tag': tag, 'error': error}
+                      for (endpoint, site, tag), error in sorted(self.errors.items(), key=str)]
+
+        snapshot.update({
+            'corp': self.sigsci.corp,
+            'refreshed': int(time.time()),
+            'sites': site_data,
+            'timeseries': {'step': aligned['step'], 'index': aligned['index'],
+                           'series': dict((item['tag'], item['data'])
+                                          for item in aligned['series'])},
+            'errors': errors
+        })
+        return snapshot
+
+    def snapshot(self):
+        """
+        Returns the last good snapshot, refreshing first if there is none yet
+        """
+        with self.lock:
+            last = self.last
+
+        return last if last is not None else self.refresh()
+
+    def start(self, interval=60):
+        """
+        Refresh every interval seconds in a background thread, returns self
+        """
+        def run():
+            while not self.stopped.is_set():
+                try:
+                    self.refresh()
+                except Exception as exception:
+                    with self.lock:
+                        self.errors[('refresh', None, None)] = str(exception)
+
+                self.stopped.wait(interval)
+
+        self.stopped.clear()
+        self.thread = threading.Thread(target=run)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop background refreshes
+        """
+        self.stopped.set()
+
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,7 @@
+"""
+ipset module
+"""
+
+from .ipset import IPSet
+from .ipset import parse_network
+from .ipset import format_network
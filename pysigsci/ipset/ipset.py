@@ -0,0 +1,211 @@
+"""
+CIDR aware IP set for blacklists, whitelists and rule lists
+"""
+
+import socket
+import binascii
+
+# address family, address bits and hex digits for each IP version
+FAMILIES = {4: (socket.AF_INET, 32, 8), 6: (socket.AF_INET6, 128, 32)}
+
+# trie node slots
+ZERO, ONE, FULL = 0, 1, 2
+
+
+def parse_network(text):
+    """
+    Parse an address or CIDR, returns (version, network, prefix length)
+    Host bits below the prefix are cleared, e.g. "10.0.0.1/8" -> (4, 167772160, 8)
+    """
+    text = text.strip()
+    address, _, prefix = text.partition('/')
+    version = 6 if ':' in address else 4
+    family, bits, _ = FAMILIES[version]
+
+    try:
+        packed = socket.inet_pton(family, address)
+    except (socket.error, ValueError):
+        raise ValueError('Invalid IP address: {}'.format(text))
+
+    prefix = int(prefix) if prefix else bits
+
+    if not 0 <= prefix <= bits:
+        raise ValueError('Invalid prefix length: {}'.format(text))
+
+    network = int(binascii.hexlify(packed), 16)
+    network &= ~((1 << (bits - prefix)) - 1)
+
+    return version, network, prefix
+
+
+def format_network(version, network, prefix):
+    """
+    Format a network as CIDR, single addresses are formatted without a prefix
+    """
+    family, bits, digits = FAMILIES[version]
+    address = socket.inet_ntop(family, binascii.unhexlify('{:0{}x}'.format(network, digits)))
+
+    if prefix == bits:
+        return address
+
+    return '{}/{}'.format(address, prefix)
+
+
+def _entry_address(entry):
+    # blacklist/whitelist entries are dicts with a source, rule list entries are strings
+    if isinstance(entry, dict):
+        return entry.get('source')
+
+    return entry
+
+
+class IPSet(object):
+    """
+    Set of IPv4 and IPv6 networks stored in a binary prefix tree
+    Networks are kept collapsed, so the set always holds the minimal covering
+    CIDR list. Lookups walk at most one node per prefix bit
+    """
+
+    def __init__(self, entries=None):
+        self.roots = {4: [None, None, False], 6: [None, None, False]}
+
+        if entries is not None:
+            for entry in entries:
+                address = _entry_address(entry)
+
+                if address:
+                    self.add(address)
+
+    @classmethod
+    def from_response(cls, response):
+        """
+        Build a set from a get_blacklist, get_whitelist or IP rule list response
+        """
+        if 'entries' in response:
+            return cls(response['entries'] or [])
+
+        return cls(response.get('data') or [])
+
+    @staticmethod
+    def _bits(network, prefix, bits):
+        for position in range(prefix):
+            yield (network >> (bits - 1 - position)) & 1
+
+    def add(self, text):
+        """
+        Add an address or CIDR, returns False if it was already covered
+        """
+        version, network, prefix = parse_network(text)
+        node = self.roots[version]
+        path = []
+
+        for bit in self._bits(network, prefix, FAMILIES[version][1]):
+            if node[FULL]:
+                return False
+
+            if node[bit] is None:
+                node[bit] = [None, None, False]
+
+            path.append(node)
+            node = node[bit]
+
+        if node[FULL]:
+            return False
+
+        # the new network subsumes everything below it
+        node[ZERO] = node[ONE] = None
+        node[FULL] = True
+
+        # merge sibling networks into their parent, e.g. two /25s into a /24
+        for parent in reversed(path):
+            if parent[ZERO] is not None and parent[ONE] is not None and \
+                    parent[ZERO][FULL] and parent[ONE][FULL]:
+                parent[ZERO] = parent[ONE] = None
+                parent[FULL] = True
+            else:
+                break
+
+        return True
+
+    def __contains__(self, text):
+        """
+        True if the address or CIDR is entirely covered by the set
+        """
+        version, network, prefix = parse_network(text)
+        node = self.roots[version]
+
+        for bit in self._bits(network, prefix, FAMILIES[version][1]):
+            if node[FULL]:
+                return True
+
+            node = node[bit]
+
+            if node is None:
+                return False
+
+        return node[FULL]
+
+    def overlaps(self, text):
+        """
+        True if the address or CIDR shares any address with the set
+        """
+        version, network, prefix = parse_network(text)
+        node = self.roots[version]
+
+        for bit in self._bits(network, prefix, FAMILIES[version][1]):
+            if node[FULL]:
+                return True
+
+            node = node[bit]
+
+            if node is None:
+                return False
+
+        return node[FULL] or node[ZERO] is not None or node[ONE] is not None
+
+    def _walk(self, version, node, network, depth):
+        if node[FULL]:
+            yield version, network, depth
+            return
+
+        bits = FAMILIES[version][1]
+
+        for bit in (ZERO, ONE):
+            if node[bit] is not None:
+                child = network | (bit << (bits - 1 - depth))
+
+                for found in self._walk(version, node[bit], child, depth + 1):
+                    yield found
+
+    def contained(self, text):
+        """
+        List the networks in the set that fall inside the address or CIDR
+        e.g. the existing /32s that a new /24 would make redundant
+        """
+        version, network, prefix = parse_network(text)
+        node = self.roots[version]
+
+        for bit in self._bits(network, prefix, FAMILIES[version][1]):
+            if node[FULL]:
+                return []
+
+            node = node[bit]
+
+            if node is None:
+                return []
+
+        return [format_network(*found) for found in self._walk(version, node, network, prefix)]
+
+    def cidrs(self):
+        """
+        The minimal list of networks covering the set, IPv4 first
+        """
+        return [format_network(*found)
+                for version in (4, 6)
+                for found in self._walk(version, self.roots[version], 0, 0)]
+
+    def __iter__(self):
+        return iter(self.cidrs())
+
+    def __len__(self):
+        return len(self.cidrs())
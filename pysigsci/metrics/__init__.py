@@ -0,0 +1,9 @@
+"""
+metrics module
+"""
+
+from .metrics import BUCKETS
+from .metrics import endpoint_template
+from .metrics import LatencyHistogram
+from .metrics import prometheus_text
+from .metrics import opentelemetry_hooks
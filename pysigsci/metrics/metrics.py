@@ -0,0 +1,216 @@
+"""
+Signal Sciences API Request Metrics
+"""
+
+import re
+import threading
+
+# histogram bucket upper bounds in seconds
+BUCKETS = [0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+
+# path segments that name the corp or site
+NAMED_SEGMENTS = {'corps': '{corp}', 'sites': '{site}', 'fromSite': '{site}'}
+
+ID_PATTERN = re.compile(r'[0-9@.:]|^[0-9a-f]{16,}$')
+
+
+def endpoint_template(endpoint):
+    """
+    Returns an endpoint with names and ids replaced by placeholders, e.g.
+    /corps/acme/sites/www/rules/5e8f0a1b -> /corps/{corp}/sites/{site}/rules/{id}
+    """
+    segments = endpoint.split('/')
+
+    for position in range(1, len(segments)):
+        previous = segments[position - 1]
+
+        if previous in NAMED_SEGMENTS:
+            segments[position] = NAMED_SEGMENTS[previous]
+        elif position > 1 and ID_PATTERN.search(segments[position]):
+            segments[position] = '{id}'
+
+    return '/'.join(segments)
+
+
+class LatencyHistogram(object):
+    """
+    Request latency histograms, status counts, bytes and retries per endpoint template
+    Register with client.add_request_hook(post=histogram.observe)
+    """
+
+    def __init__(self, buckets=None):
+        self.buckets = sorted(buckets or BUCKETS)
+        self.lock = threading.Lock()
+        self.endpoints = {}
+
+    def observe(self, call):
+        """
+        Post request hook, records one completed call
+        """
+        key = (call['method'], call['template'])
+
+        with self.lock:
+            stats = self.endpoints.get(key)
+
+            if stats is None:
+                stats = {'counts': [0] * (len(self.buckets) + 1), 'count': 0, 'sum': 0.0,
+                         'statuses': {}, 'request_bytes': 0, 'response_bytes': 0,
+                         'retries': 0}
+                self.endpoints[key] = stats
+
+            index = 0
+            while index < len(self.buckets) and call['latency'] > self.buckets[index]:
+                index += 1
+
+            stats['counts'][index] += 1
+            stats['count'] += 1
+            stats['sum'] += call['latency']
+            stats['statuses'][call['status']] = stats['statuses'].get(call['status'], 0) + 1
+            stats['request_bytes'] += call['request_bytes']
+            stats['response_bytes'] += call['response_bytes']
+            stats['retries'] += call['retries']
+
+    def percentile(self, method, template, quantile):
+        """
+        Estimated latency in seconds at a quantile (0-1) for an endpoint, or None
+        The upper bound of the bucket holding the quantile is returned
+        """
+        with self.lock:
+            stats = self.endpoints.get((method, template))
+
+            if stats is None or not stats['count']:
+                return None
+
+            rank = quantile * stats['count']
+            seen = 0
+
+            for index, count in enumerate(stats['counts']):
+                seen += count
+
+                if seen >= rank:
+                    return self.buckets[index] if index < len(self.buckets) \
+                        else self.buckets[-1]
+
+        return None
+
+    def summary(self):
+        """
+        Returns a list of per endpoint statistics, slowest total time first
+        """
+        with self.lock:
+            keys = list(self.endpoints)
+
+        rows = []
+
+        for method, template in keys:
+            stats = self.endpoints[(method, template)]
+            rows.append({
+                'method': method,
+                'endpoint': template,
+                'count': stats['count'],
+                'seconds': round(stats['sum'], 6),
+                'p50': self.percentile(method, template, 0.5),
+                'p95': self.percentile(method, template, 0.95),
+                'p99': self.percentile(method, template, 0.99),
+                'statuses': dict(stats['statuses']),
+                'request_bytes': stats['request_bytes'],
+                'response_bytes': stats['response_bytes'],
+                'retries': stats['retries']
+            })
+
+        return sorted(rows, key=lambda row: row['seconds'], reverse=True)
+
+
+def _labels(**labels):
+    return ','.join('{}="{}"'.format(name, str(value).replace('"', '\\"'))
+                    for name, value in sorted(labels.items()))
+
+
+def prometheus_text(histogram, prefix='pysigsci', hedging=None):
+    """
+    Returns the histogram in the Prometheus text exposition format
+    hedging adds the counters of HedgingTransport.stats() per endpoint
+    """
+    lines = [
+        '# TYPE {}_request_duration_seconds histogram'.format(prefix)
+    ]
+    totals = []
+
+    with histogram.lock:
+        endpoints = sorted(histogram.endpoints.items())
+
+        for (method, template), stats in endpoints:
+            cumulative = 0
+
+            for index, bound in enumerate(histogram.buckets + ['+Inf']):
+                cumulative += stats['counts'][index]
+                lines.append('{}_request_duration_seconds_bucket{{{}}} {}'.format(
+                    prefix, _labels(method=method, endpoint=template, le=bound), cumulative))
+
+            labels = _labels(method=method, endpoint=template)
+            lines.append('{}_request_duration_seconds_sum{{{}}} {}'.format(
+                prefix, labels, stats['sum']))
+            lines.append('{}_request_duration_seconds_count{{{}}} {}'.format(
+                prefix, labels, stats['count']))
+
+            for status, count in sorted(stats['statuses'].items(), key=str):
+                totals.append(('requests_total', _labels(method=method, endpoint=template,
+                                                         status=status), count))
+
+            totals.append(('request_bytes_total', labels, stats['request_bytes']))
+            totals.append(('response_bytes_total', labels, stats['response_bytes']))
+            totals.append(('retries_total', labels, stats['retries']))
+
+    for name in ['requests_total', 'request_bytes_total', 'response_bytes_total',
+                 'retries_total']:
+        lines.append('# TYPE {}_{} counter'.format(prefix, name))
+        lines.extend('{}_{}{{{}}} {}'.format(prefix, name, labels, value)
+                     for metric, labels, value in totals if metric == name)
+
+    if hedging is not None:
+        for name, key in [('hedged_requests_total', 'requests'), ('hedges_total', 'hedges'),
+                          ('hedge_wins_total', 'wins')]:
+            lines.append('# TYPE {}_{} counter'.format(prefix, name))
+            lines.extend('{}_{}{{{}}} {}'.format(prefix, name, _labels(endpoint=template),
+                                                 counts[key])
+                         for template, counts in sorted(hedging['endpoints'].items()))
+
+    return '\n'.join(lines) + '\n'
+
+
+def opentelemetry_hooks(tracer=None):
+    """
+    Returns (pre, post) hooks that record each call as an OpenTelemetry span
+    Requires the opentelemetry-api package
+    """
+    from opentelemetry import trace
+
+    if tracer is None:
+        tracer = trace.get_tracer('pysigsci')
+
+    def pre(call):
+        call['span'] = tracer.start_span('{} {}'.format(call['method'], call['template']),
+                                         kind=trace.SpanKind.CLIENT)
+
+    def post(call):
+        span = call.pop('span', None)
+
+        if span is None:
+            return
+
+        span.set_attribute('http.method', call['method'])
+        span.set_attribute('http.route', call['template'])
+        span.set_attribute('http.url', call['url'])
+        span.set_attribute('pysigsci.retries', call['retries'])
+        span.set_attribute('pysigsci.request_bytes', call['request_bytes'])
+        span.set_attribute('pysigsci.response_bytes', call['response_bytes'])
+
+        if call['status'] is not None:
+            span.set_attribute('http.status_code', call['status'])
+
+        if call['error'] is not None:
+            span.set_status(trace.Status(trace.StatusCode.ERROR, call['error']))
+
+        span.end()
+
+    return pre, post
@@ -0,0 +1,5 @@
+"""
+mirror module
+"""
+
+from .mirror import ConfigMirror
@@ -0,0 +1,322 @@
+"""
+Signal Sciences Configuration Mirror
+"""
+
+import os
+import re
+import copy
+import json
+import time
+import hashlib
+import calendar
+import tempfile
+
+# Mirrored corp resources, relative to /corps/{corpName}
+CORP_RESOURCES = ['', '/sites', '/rules', '/lists', '/tags', '/users']
+
+# Mirrored site resources, relative to /corps/{corpName}/sites/{siteName}
+SITE_RESOURCES = ['', '/rules', '/signalRules', '/configuredtemplates', '/advancedRules',
+                  '/lists', '/tags', '/alerts', '/redactions', '/integrations',
+                  '/headerLinks', '/whitelist', '/blacklist', '/paramwhitelist',
+                  '/pathwhitelist', '/members']
+
+# Activity event type keywords mapped to the resources they change, checked in order
+ACTIVITY_RESOURCES = [
+    ('templat', ['/configuredtemplates']),
+    ('advancedrule', ['/advancedRules']),
+    ('signalrule', ['/rules', '/signalRules']),
+    ('ratelimit', ['/rules']),
+    ('rule', ['/rules', '/signalRules']),
+    ('paramwhitelist', ['/paramwhitelist']),
+    ('pathwhitelist', ['/pathwhitelist']),
+    ('whitelist', ['/whitelist']),
+    ('allowlist', ['/whitelist']),
+    ('blacklist', ['/blacklist']),
+    ('blocklist', ['/blacklist']),
+    ('list', ['/lists']),
+    ('tag', ['/tags']),
+    ('signal', ['/tags']),
+    ('alert', ['/alerts']),
+    ('redaction', ['/redactions']),
+    ('integration', ['/integrations']),
+    ('headerlink', ['/headerLinks']),
+    ('member', ['/members']),
+    ('user', ['/users', '/members']),
+    ('site', ['', '/sites']),
+    ('corp', [''])
+]
+
+# Activity event types that never change mirrored configuration
+IGNORED_ACTIVITY = ['login', 'logout', 'password', 'token', 'agent', 'flag']
+
+# Seconds before the local time of a full sync that updates start reading activity,
+# so a local clock ahead of the API does not skip entries
+CURSOR_SKEW = 300
+
+# the +hh:mm or -hh:mm offset at the end of an RFC3339 timestamp
+UTC_OFFSET = re.compile(r'([+-])(\d{2}):?(\d{2})$')
+
+
+def activity_time(entry):
+    """
+    Epoch seconds of an activity entry's created time, or None
+    """
+    created = entry.get('created')
+
+    if isinstance(created, (int, float)):
+        return int(created)
+
+    if not created:
+        return None
+
+    offset = 0
+    match = UTC_OFFSET.search(created)
+
+    if match:
+        sign, hours, minutes = match.groups()
+        offset = (int(hours) * 3600 + int(minutes) * 60) * (-1 if sign == '-' else 1)
+
+    try:
+        return calendar.timegm(time.strptime(created[:19], '%Y-%m-%dT%H:%M:%S')) - offset
+    except ValueError:
+        return None
+
+
+class ConfigMirror(object):
+    """
+    Local mirror of corp and site configuration
+    One full sync, then incremental updates driven by the activity log
+    """
+
+    def __init__(self, directory='/tmp/pysigsci/mirror'):
+        self.directory = directory
+        self.responses_dir = os.path.join(directory, 'responses')
+        self.state_file = os.path.join(directory, 'state.json')
+        self.cache = {}
+        self.state = {'corp': None, 'cursor': None, 'seen': [], 'sites': []}
+
+        if os.path.exists(self.state_file):
+            with open(self.state_file, 'r') as infile:
+                self.state = json.load(infile)
+
+    def _response_path(self, endpoint):
+        digest = hashlib.sha1(endpoint.encode('utf-8')).hexdigest()
+        return os.path.join(self.responses_dir, digest[:2], '{}.json'.format(digest))
+
+    @staticmethod
+    def _write(path, data):
+        directory = os.path.dirname(path)
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        handle, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'w') as outfile:
+            json.dump(data, outfile)
+        os.rename(temp_path, path)
+
+    def lookup(self, endpoint):
+        """
+        Return the mirrored response for an endpoint, or None if not mirrored
+        """
+        if endpoint not in self.cache:
+            path = self._response_path(endpoint)
+
+            if not os.path.exists(path):
+                return None
+
+            with open(path, 'r') as infile:
+                self.cache[endpoint] = json.load(infile)['response']
+
+        return copy.deepcopy(self.cache[endpoint])
+
+    def store(self, endpoint, response):
+        """
+        Save a response for an endpoint
+        """
+        self.cache[endpoint] = response
+        self._write(self._response_path(endpoint), {'endpoint': endpoint, 'response': response})
+
+    def remove(self, endpoint):
+        """
+        Drop a mirrored endpoint
+        """
+        self.cache.pop(endpoint, None)
+        path = self._response_path(endpoint)
+
+        if os.path.exists(path):
+            os.remove(path)
+
+    @staticmethod
+    def _client(sigsci):
+        # the mirror always reads from the API, never from itself
+        client = copy.copy(sigsci)
+        client.mirror = None
+        return client
+
+    @staticmethod
+    def corp_endpoint(sigsci, resource=''):
+        """
+        Endpoint for a corp resource
+        """
+        return '{}/{}{}'.format(sigsci.ep_corps, sigsci.corp, resource)
+
+    @staticmethod
+    def site_endpoint(sigsci, site, resource=''):
+        """
+        Endpoint for a site resource
+        """
+        return '{}/{}/sites/{}{}'.format(sigsci.ep_corps, sigsci.corp, site, resource)
+
+    def _fetch(self, client, endpoints):
+        for endpoint in endpoints:
+            self.store(endpoint, client._make_request(endpoint=endpoint))
+
+        return len(endpoints)
+
+    def _sync_sites(self, client):
+        response = self.lookup(self.corp_endpoint(client, '/sites')) or {}
+        sites = sorted(site['name'] for site in response.get('data') or [])
+        calls = 0
+
+        for site in sites:
+            if site not in self.state['sites']:
+                calls += self._fetch(client, [self.site_endpoint(client, site, resource)
+                                              for resource in SITE_RESOURCES])
+
+        for site in self.state['sites']:
+            if site not in sites:
+                for resource in SITE_RESOURCES:
+                    self.remove(self.site_endpoint(client, site, resource))
+
+        self.state['sites'] = sites
+        return calls
+
+    def _save_state(self):
+        self._write(self.state_file, self.state)
+
+    def full_sync(self, sigsci):
+        """
+        Fetch all mirrored corp and site configuration
+        """
+        client = self._client(sigsci)
+        cursor = int(time.time()) - CURSOR_SKEW
+
+        if self.state['corp'] != client.corp:
+            self.state = {'corp': client.corp, 'cursor': None, 'seen': [], 'sites': []}
+
+        calls = self._fetch(client, [self.corp_endpoint(client, resource)
+                                     for resource in CORP_RESOURCES])
+        self.state['sites'] = []
+        calls += self._sync_sites(client)
+        self.state['cursor'] = cursor
+        self.state['seen'] = []
+        self._save_state()
+
+        return {'calls': calls, 'sites': len(self.state['sites'])}
+
+    @staticmethod
+    def activity_resources(event_type):
+        """
+        Map an activity event type to the resources it changes
+        None means the event type is not recognized
+        """
+        event_type = (event_type or '').lower()
+
+        for keyword in IGNORED_ACTIVITY:
+            if keyword in event_type:
+                return []
+
+        for keyword, resources in ACTIVITY_RESOURCES:
+            if keyword in event_type:
+                return resources
+
+        return None
+
+    def _changed_endpoints(self, client, entry, site=None):
+        site = site or entry.get('siteName') or entry.get('site')
+
+        if isinstance(site, dict):
+            site = site.get('name')
+
+        resources = self.activity_resources(entry.get('eventType') or entry.get('type'))
+
+        if site:
+            if resources is None:
+                resources = SITE_RESOURCES
+
+            # e.g. a site being created also changes the corp site list
+            corp_only = [resource for resource in resources
+                         if resource in CORP_RESOURCES and resource not in SITE_RESOURCES]
+
+            return [self.site_endpoint(client, site, resource) for resource in resources
+                    if resource in SITE_RESOURCES] + \
+                [self.corp_endpoint(client, resource) for resource in corp_only]
+
+        if resources is None:
+            resources = CORP_RESOURCES
+
+        return [self.corp_endpoint(client, resource) for resource in resources
+                if resource in CORP_RESOURCES]
+
+    def update(self, sigsci, poll_sites=False):
+        """
+        Apply changes recorded in the corp activity log since the last sync
+        Only resources with a matching activity entry are fetched again. poll_sites also
+        reads each site's activity log, one or more calls per site
+        The cursor moves to the newest entry's created time, entries already applied
+        at that time are skipped
+        """
+        if self.state['cursor'] is None or self.state['corp'] != sigsci.corp:
+            return self.full_sync(sigsci)
+
+        client = self._client(sigsci)
+        cursor = self.state['cursor']
+        seen = set(self.state.get('seen') or [])
+        parameters = {'from': cursor}
+        activity = []
+        calls = 0
+
+        for page in client.iter_pages(client.get_corp_activity, parameters):
+            calls += 1
+            activity.extend((entry, None) for entry in page.get('data') or [])
+
+        if poll_sites:
+            for site in self.state['sites']:
+                client.site = site
+                for page in client.iter_pages(client.get_activity, parameters):
+                    calls += 1
+                    activity.extend((entry, site) for entry in page.get('data') or [])
+
+        changed = set()
+        times = []
+
+        for entry, site in activity:
+            created = activity_time(entry)
+
+            if created is not None:
+                times.append(created)
+
+            # entries before the cursor, or at it and seen, were applied by an earlier update
+            applied = created is not None and created < cursor
+            repeated = created == cursor and entry.get('id') in seen
+
+            if applied or repeated:
+                continue
+
+            changed.update(self._changed_endpoints(client, entry, site))
+
+        changed = sorted(changed)
+        calls += self._fetch(client, changed)
+
+        if self.corp_endpoint(client, '/sites') in changed:
+            calls += self._sync_sites(client)
+
+        newest = max(times + [cursor])
+        ids = set(entry['id'] for entry, _ in activity
+                  if entry.get('id') and activity_time(entry) == newest)
+        self.state['cursor'] = newest
+        self.state['seen'] = sorted(ids | seen if newest == cursor else ids)
+        self._save_state()
+
+        return {'calls': calls, 'entries': len(activity), 'refetched': changed}
@@ -18,6 +18,9 @@ class PowerRules(object):
     GIT_URL = 'https://github.com/foospidy/sigsci-power-rules.git'
     REPO_DIR = '{}/sigsci-power-rules'.format(tempfile.gettempdir())
 
+    # set once the repo has been cloned or pulled by this instance
+    updated = False
+
     def get_list(self):
         """
         Get list of power rules
@@ -45,16 +48,11 @@ class PowerRules(object):
                 count += 1
         print('')
 
-    def deploy_rule_pack(self, sigsciapi, rulepack, cli=False):
+    def update_repo(self):
         """
-        Deploy a rule pack
+        Clone the rule pack repo, or pull it if it was cloned before
         """
         from git import Repo
-        import glob
-
-        response = {}
-        success = True
-        messages = ''
 
         if os.path.exists(self.REPO_DIR):
             try:
@@ -66,6 +64,23 @@ class PowerRules(object):
         else:
             Repo.clone_from(self.GIT_URL, self.REPO_DIR)
 
+        self.updated = True
+
+    def deploy_rule_pack(self, sigsciapi, rulepack, cli=False):
+        """
+        Deploy a rule pack
+        The repo is updated on the first deploy only, so deploying to many sites
+        with one instance pulls once
+        """
+        import glob
+
+        response = {}
+        success = True
+        messages = ''
+
+        if not self.updated:
+            self.update_repo()
+
         custom_signals = glob.glob('{}/power-rules-{}/custom-signals*.json'.format(self.REPO_DIR,
                                                                                    rulepack))
         custom_alerts = glob.glob('{}/power-rules-{}/custom-alerts*.json'.format(self.REPO_DIR,
@@ -0,0 +1,7 @@
+"""
+profiling module
+"""
+
+from .profiling import PHASES
+from .profiling import phase
+from .profiling import Profiler
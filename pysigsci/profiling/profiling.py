@@ -0,0 +1,280 @@
+"""
+Signal Sciences CLI Profiling
+"""
+
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+
+# phases reported, processing is the time not spent in the others
+PHASES = ['network', 'decode', 'processing', 'output']
+
+_ACTIVE = None
+
+
+def _cpu_time():
+    # process CPU time, time.clock on Python 2
+    if hasattr(time, 'process_time'):
+        return time.process_time()
+
+    return getattr(time, 'clock')()
+
+
+def _thread_time():
+    # CPU time of the calling thread where available
+    thread_time = getattr(time, 'thread_time', None)
+    return thread_time() if thread_time is not None else _cpu_time()
+
+
+@contextmanager
+def phase(name):
+    """
+    Attribute the time spent in the block to a phase of the active profiler
+    Does nothing when no profiler is running
+    """
+    profiler = _ACTIVE
+
+    if profiler is None:
+        yield
+        return
+
+    wall = time.time()
+    cpu = _thread_time()
+
+    try:
+        yield
+    finally:
+        profiler.record(name, time.time() - wall, _thread_time() - cpu)
+
+
+class Sampler(object):
+    """
+    Samples the stacks of all threads, for speedscope's sampled profile format
+    """
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.frames = []
+        self.frame_index = {}
+        self.samples = {}
+        self.running = False
+        self.thread = None
+        self.started = None
+
+    def _frame(self, frame):
+        code = frame.f_code
+        key = (code.co_name, code.co_filename, code.co_firstlineno)
+
+        if key not in self.frame_index:
+            self.frame_index[key] = len(self.frames)
+            self.frames.append({'name': code.co_name, 'file': code.co_filename,
+                                'line': code.co_firstlineno})
+
+        return self.frame_index[key]
+
+    def _run(self):
+        last = time.time()
+
+        while self.running:
+            time.sleep(self.interval)
+            now = time.time()
+
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.thread.ident:
+                    continue
+
+                stack = []
+
+                while frame is not None:
+                    stack.append(self._frame(frame))
+                    frame = frame.f_back
+
+                stack.reverse()
+                samples, weights = self.samples.setdefault(thread_id, ([], []))
+                samples.append(stack)
+                weights.append(now - last)
+
+            last = now
+
+    def start(self):
+        """
+        Start sampling in a background thread
+        """
+        self.running = True
+        self.started = time.time()
+        self.thread = threading.Thread(target=self._run)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def stop(self):
+        """
+        Stop sampling
+        """
+        self.running = False
+        self.thread.join()
+
+    def speedscope(self, name):
+        """
+        Returns the samples as a speedscope file, one profile per thread
+        """
+        profiles = []
+
+        for thread_id, (samples, weights) in sorted(self.samples.items()):
+            profiles.append({
+                'type': 'sampled',
+                'name': 'thread {}'.format(thread_id),
+                'unit': 'seconds',
+                'startValue': 0,
+                'endValue': sum(weights),
+                'samples': samples,
+                'weights': weights
+            })
+
+        return {
+            '$schema': 'https://www.speedscope.app/file-format-schema.json',
+            'name': name,
+            'exporter': 'pysigsci',
+            'shared': {'frames': self.frames},
+            'profiles': profiles
+        }
+
+
+class Profiler(object):
+    """
+    Records wall and CPU time per phase, API calls, bytes transferred and peak memory
+    Network and decode time come from request hooks, output time from phase('output')
+    blocks, and processing is the rest. With concurrent requests, network time is
+    summed over threads and can exceed the wall time
+    With an output path ending in .json a speedscope profile of all threads is
+    written, any other path gets cProfile stats of the main thread
+    """
+
+    def __init__(self, output=None, name='pysigsci'):
+        self.output = output
+        self.name = name
+        self.lock = threading.Lock()
+        self.phases = dict((name, {'wall': 0.0, 'cpu': 0.0}) for name in PHASES)
+        self.calls = 0
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.retries = 0
+        self.started = None
+        self.cpu_started = None
+        self.profile = None
+        self.sampler = None
+        self.tracemalloc = None
+
+    def record(self, name, wall, cpu):
+        """
+        Add time to a phase
+        """
+        with self.lock:
+            entry = self.phases.setdefault(name, {'wall': 0.0, 'cpu': 0.0})
+            entry['wall'] += wall
+            entry['cpu'] += cpu
+
+    def before_request(self, call):
+        """
+        Pre request hook
+        """
+        call['profile_cpu'] = _thread_time()
+
+    def after_request(self, call):
+        """
+        Post request hook
+        """
+        cpu = _thread_time() - call.pop('profile_cpu', _thread_time())
+
+        with self.lock:
+            self.calls += 1
+            self.request_bytes += call['request_bytes']
+            self.response_bytes += call['response_bytes']
+            self.retries += call['retries']
+
+        # decoding is CPU bound, the rest of the call's CPU time is network handling
+        self.record('network', call['latency'], max(cpu - call['decode'], 0.0))
+        self.record('decode', call['decode'], min(call['decode'], cpu))
+
+    def attach(self, client):
+        """
+        Record the API calls of a client and of clones made from it afterwards
+        """
+        client.add_request_hook(self.before_request, self.after_request)
+
+    def start(self):
+        """
+        Start profiling and make this the active profiler for phase()
+        """
+        global _ACTIVE
+
+        try:
+            import tracemalloc
+            tracemalloc.start()
+            self.tracemalloc = tracemalloc
+        except ImportError:
+            pass
+
+        if self.output is not None and self.output.endswith('.json'):
+            self.sampler = Sampler()
+            self.sampler.start()
+        elif self.output is not None:
+            import cProfile
+            self.profile = cProfile.Profile()
+            self.profile.enable()
+
+        self.started = time.time()
+        self.cpu_started = _cpu_time()
+        _ACTIVE = self
+
+    def stop(self):
+        """
+        Stop profiling, write the profile file if set, and return the summary
+        """
+        global _ACTIVE
+
+        _ACTIVE = None
+        wall = time.time() - self.started
+        cpu = _cpu_time() - self.cpu_started
+        peak = None
+
+        if self.profile is not None:
+            self.profile.disable()
+            self.profile.dump_stats(self.output)
+
+        if self.sampler is not None:
+            self.sampler.stop()
+
+            with open(self.output, 'w') as outfile:
+                json.dump(self.sampler.speedscope(self.name), outfile)
+
+        if self.tracemalloc is not None:
+            peak = self.tracemalloc.get_traced_memory()[1]
+            self.tracemalloc.stop()
+
+        phases = dict((name, dict(entry)) for name, entry in self.phases.items())
+        phases['processing'] = {
+            'wall': max(wall - sum(entry['wall'] for name, entry in phases.items()
+                                   if name != 'processing'), 0.0),
+            'cpu': max(cpu - sum(entry['cpu'] for name, entry in phases.items()
+                                 if name != 'processing'), 0.0)
+        }
+
+        for entry in phases.values():
+            entry['wall'] = round(entry['wall'], 6)
+            entry['cpu'] = round(entry['cpu'], 6)
+
+        return {
+            'type': 'profile',
+            'name': self.name,
+            'wall': round(wall, 6),
+            'cpu': round(cpu, 6),
+            'phases': phases,
+            'calls': self.calls,
+            'retries': self.retries,
+            'request_bytes': self.request_bytes,
+            'response_bytes': self.response_bytes,
+            'peak_memory': peak,
+            'output': self.output
+        }
@@ -0,0 +1,7 @@
+"""
+reconcile module
+"""
+
+from .reconcile import RESOURCES
+from .reconcile import Reconciler
+from .reconcile import load_desired_state
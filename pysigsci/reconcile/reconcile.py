@@ -0,0 +1,223 @@
+"""
+Signal Sciences Desired State Reconciler
+"""
+
+import os
+import json
+import glob
+from pysigsci.audit import VOLATILE_FIELDS, DEFAULT_ALERTS
+from pysigsci.sigsciapi import response_error
+
+# Managed resources in the order they are applied, so signals and lists
+# exist before the rules and alerts that reference them. Deletes run in
+# reverse order, so rules go before the lists and signals they reference.
+# name: (getter, adder, updater, deleter, key fields)
+# Resources without an updater are only added or deleted.
+RESOURCES = [
+    ('site-signals', ('get_site_signals', 'add_site_signals', None,
+                      'delete_site_signal', ['shortName'])),
+    ('rule-lists', ('get_site_rule_lists', 'add_site_rule_lists', 'replace_site_rule_lists',
+                    'delete_site_rule_lists', ['name'])),
+    ('site-rules', ('get_site_rules', 'add_site_rules', 'update_site_rule',
+                    'delete_site_rule', ['description'])),
+    ('custom-alerts', ('get_site_alerts', 'add_site_alert', 'update_site_alert',
+                       'delete_site_alert', ['tagName', 'longName'])),
+    ('header-links', ('get_header_links', 'add_header_links', None,
+                      'delete_header_links', ['name'])),
+    ('integrations', ('get_integrations', 'add_integration', 'update_integration',
+                      'delete_integration', ['type', 'url']))
+]
+
+
+def item_key(item, fields):
+    """
+    Returns the identifying key of a config item, e.g. a rule list's name
+    """
+    return tuple(item.get(field) for field in fields)
+
+
+def _canonical(value):
+    return json.dumps(value, sort_keys=True)
+
+
+def differs(desired, actual):
+    """
+    True if any field set in the desired item has a different value in the actual item
+    Fields only present in the actual item (ids, timestamps, defaults) are ignored,
+    and lists are compared as sets, e.g. rule list entries in another order
+    """
+    for field, value in desired.items():
+        if field in VOLATILE_FIELDS:
+            continue
+
+        if isinstance(value, dict) and isinstance(actual.get(field), dict):
+            if differs(value, actual[field]):
+                return True
+        elif isinstance(value, list) and isinstance(actual.get(field), list):
+            if set(_canonical(item) for item in value) != \
+                    set(_canonical(item) for item in actual[field]):
+                return True
+        elif actual.get(field) != value:
+            return True
+
+    return False
+
+
+def load_desired_state(directory):
+    """
+    Load desired state from a directory, one or more files per resource
+    e.g. rule-lists.json, site-rules-xss.json, each holding an object or a list
+    """
+    desired = {}
+
+    for name, _ in RESOURCES:
+        files = sorted(glob.glob(os.path.join(directory, '{}*.json'.format(name))))
+
+        if not files:
+            continue
+
+        desired[name] = []
+
+        for path in files:
+            with open(path, 'r') as infile:
+                data = json.load(infile)
+
+            desired[name].extend(data if isinstance(data, list) else [data])
+
+    return desired
+
+
+class Reconciler(object):
+    """
+    Converge sites to a desired state for alerts, signals, rules, rule lists,
+    header links and integrations. Actual state is read once per resource and
+    site, and only differences are written
+    """
+
+    def __init__(self, desired, prune=False):
+        """
+        desired is a dict of resource name to items, or a directory to load it from
+        With prune, items that are not in the desired state are deleted
+        """
+        if not isinstance(desired, dict):
+            desired = load_desired_state(desired)
+
+        self.desired = desired
+        self.prune = prune
+
+    def plan_site(self, client):
+        """
+        Returns the changes needed for the client's site, in apply order
+        Built-in alerts (DEFAULT_ALERTS) are never pruned
+        """
+        plan = []
+        deletes = []
+
+        for name, (getter, _, updater, _, fields) in RESOURCES:
+            if name not in self.desired:
+                continue
+
+            actual = dict((item_key(item, fields), item)
+                          for item in getattr(client, getter)().get('data') or [])
+            wanted = set()
+
+            for item in self.desired[name]:
+                key = item_key(item, fields)
+                wanted.add(key)
+                change = {'site': client.site, 'resource': name, 'key': list(key)}
+
+                if key not in actual:
+                    change.update({'action': 'add', 'data': item})
+                elif updater is not None and differs(item, actual[key]):
+                    data = dict((field, value) for field, value in actual[key].items()
+                                if field not in VOLATILE_FIELDS)
+                    data.update(item)
+                    change.update({'action': 'update', 'id': actual[key]['id'], 'data': data})
+                else:
+                    continue
+
+                plan.append(change)
+
+            if not self.prune:
+                continue
+
+            resource_deletes = []
+
+            for key, item in actual.items():
+                if key in wanted:
+                    continue
+
+                if name == 'custom-alerts' and item.get('tagName') in DEFAULT_ALERTS:
+                    continue
+
+                # signals are deleted by tag name, everything else by id
+                identifier = (item.get('tagName') or item.get('id')) \
+                    if name == 'site-signals' else item.get('id')
+                resource_deletes.append({'site': client.site, 'resource': name,
+                                         'key': list(key), 'action': 'delete',
+                                         'id': identifier})
+
+            deletes.insert(0, resource_deletes)
+
+        # references are removed before what they reference
+        return plan + [change for resource_deletes in deletes for change in resource_deletes]
+
+    @staticmethod
+    def apply_change(client, change):
+        """
+        Apply one planned change, returns the API response
+        """
+        _, adder, updater, deleter, _ = dict(RESOURCES)[change['resource']]
+
+        if change['action'] == 'add':
+            return getattr(client, adder)(change['data'])
+
+        if change['action'] == 'update':
+            return getattr(client, updater)(change['id'], change['data'])
+
+        return getattr(client, deleter)(change['id'])
+
+    def reconcile_site(self, client, dry_run=False):
+        """
+        Plan and apply the changes for one site, returns the outcome of each change
+        """
+        outcomes = []
+
+        for change in self.plan_site(client):
+            outcome = dict((field, value) for field, value in change.items() if field != 'data')
+            outcome['status'] = 'planned' if dry_run else 'applied'
+
+            if not dry_run:
+                try:
+                    response = self.apply_change(client, change)
+                except Exception as error:
+                    response = {'message': str(error)}
+
+                if response_error(response) is not None:
+                    outcome.update({'status': 'error', 'message': response_error(response)})
+
+            outcomes.append(outcome)
+
+        return outcomes
+
+    def reconcile(self, sigsci, sites=None, dry_run=False, workers=None):
+        """
+        Reconcile sites (default all sites) concurrently
+        Yields a summary per site as it completes, with the outcome of each change
+        """
+        def run(client):
+            return self.reconcile_site(client, dry_run)
+
+        for site, outcomes, error in sigsci.map_sites(run, sites, workers):
+            if error is not None:
+                yield {'site': site, 'status': 'error', 'message': str(error), 'changes': []}
+                continue
+
+            status = 'planned' if dry_run else 'applied'
+
+            if not outcomes:
+                status = 'converged'
+            elif [outcome for outcome in outcomes if outcome['status'] == 'error']:
+                status = 'error'
+
+            yield {'site': site, 'status': status, 'changes': outcomes}
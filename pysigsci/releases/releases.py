@@ -2,7 +2,11 @@
 Signal Sciences Releases Module
 """
 
-import requests
+import os
+import json
+import time
+import tempfile
+import threading
 
 
 MODULES = ['apache',
@@ -18,15 +22,133 @@ MODULES = ['apache',
            'php',
            'python']
 
+MODULE_URL = 'https://dl.signalsciences.net/sigsci-module-{}/VERSION'
+AGENT_URL = 'https://dl.signalsciences.net/sigsci-agent/VERSION'
+
+# Seconds to wait for dl.signalsciences.net
+TIMEOUT = 10
+
+# Seconds a cached VERSION is used before it is revalidated
+CACHE_TTL = 3600
+CACHE_FILE = '{}/pysigsci-releases.json'.format(tempfile.gettempdir())
+
+_SESSION = None
+_CACHE = None
+_LOCK = threading.Lock()
+
+
+def _session():
+    global _SESSION
+
+    if _SESSION is None:
+        # imported on first use, so scripts start without loading requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        session = requests.Session()
+        session.mount('https://', HTTPAdapter(pool_maxsize=len(MODULES)))
+        _SESSION = session
+
+    return _SESSION
+
+
+def _cache():
+    global _CACHE
+
+    if _CACHE is None:
+        try:
+            with open(CACHE_FILE, 'r') as infile:
+                _CACHE = json.load(infile)
+        except (IOError, OSError, ValueError):
+            _CACHE = {}
+
+    return _CACHE
+
+
+def _save_cache():
+    with _LOCK:
+        data = json.dumps(_cache())
+
+    try:
+        handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(CACHE_FILE))
+        with os.fdopen(handle, 'w') as outfile:
+            outfile.write(data)
+        os.rename(temp_path, CACHE_FILE)
+    except (IOError, OSError):
+        pass
+
+
+def _get_version(url, save=True):
+    """
+    Returns the contents of a VERSION file, cached for CACHE_TTL seconds
+    Expired entries are revalidated with a conditional request
+    """
+    with _LOCK:
+        entry = dict(_cache().get(url, {}))
+
+    if entry and time.time() - entry['fetched'] < CACHE_TTL:
+        return entry['version']
+
+    import requests
+
+    headers = {}
+    if entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+
+    try:
+        response = _session().get(url, headers=headers, timeout=TIMEOUT)
+    except requests.RequestException:
+        # serve a stale version rather than failing
+        if entry:
+            return entry['version']
+        raise
+
+    if response.status_code == 304 and entry:
+        entry['fetched'] = time.time()
+    elif response.status_code == 200:
+        entry = {
+            'version': response.content.decode('utf-8', 'replace').strip(),
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched': time.time()
+        }
+    elif entry:
+        return entry['version']
+    else:
+        # do not cache error pages
+        return response.text.strip()
+
+    with _LOCK:
+        _cache()[url] = entry
+
+    if save:
+        _save_cache()
+
+    return entry['version']
+
+
 def get_latest_module_versions():
     """
     Returns lastest module versions
     """
+    from multiprocessing.pool import ThreadPool
+
+    pool = ThreadPool(len(MODULES))
+    try:
+        versions = pool.map(lambda module: _get_version(MODULE_URL.format(module), False),
+                            MODULES)
+    finally:
+        pool.close()
+        pool.join()
+
+    _save_cache()
 
     module_dict = {}
 
-    for module in MODULES:
-        module_dict[module] = get_latest_module_version(module)
+    for module, version in zip(MODULES, versions):
+        module_dict[module] = {module: '{}'.format(version)}
 
     return module_dict
 
@@ -35,14 +157,11 @@ def get_latest_module_version(module='apache'):
     Returns lastest version of provided module
     """
 
-    url = 'https://dl.signalsciences.net/sigsci-module-{}/VERSION'.format(module)
-    response = requests.get(url)
-    return {module: '{}'.format(response.text.strip())}
+    return {module: '{}'.format(_get_version(MODULE_URL.format(module)))}
 
 def get_latest_agent_version():
     """
     Returns lastest version agent
     """
 
-    response = requests.get('https://dl.signalsciences.net/sigsci-agent/VERSION')
-    return {"agent": '{}'.format(response.text.strip())}
+    return {"agent": '{}'.format(_get_version(AGENT_URL))}
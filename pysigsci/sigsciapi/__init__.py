@@ -5,6 +5,16 @@ pysigsciapi module
 import datetime
 import calendar
 from .sigsciapi import SigSciApi
+from .tokencache import TokenCache
+from .transport import Transport
+from .transport import RequestsTransport
+from .transport import Urllib3Transport
+from .transport import HttpxTransport
+from .transport import TRANSPORTS
+from .transport import create_transport
+from .transport import RecordingTransport
+from .transport import ReplayTransport
+from .transport import HedgingTransport
 
 def parse_time_delta(delta):
     """
@@ -31,3 +41,16 @@ def parse_time_delta(delta):
             return epoch
 
     return False
+
+
+def response_error(response):
+    """
+    Returns the error message of an API response, or None if it succeeded
+    Errors are returned as {"message": ...}, while 204 responses become
+    {"message": "<METHOD> successful."}
+    """
+    if isinstance(response, dict) and 'message' in response and 'id' not in response:
+        if not str(response['message']).endswith(' successful.'):
+            return response['message']
+
+    return None
@@ -2,35 +2,103 @@
 Signal Sciences API Client
 """
 
-import requests
+import os
+import copy
+import time
+import threading
+from multiprocessing.pool import ThreadPool
 import pysigsci
+from pysigsci.sigsciapi.transport import Transport, create_transport
+
+try:
+    from urllib.parse import urlparse, parse_qsl
+except ImportError:
+    from urlparse import urlparse, parse_qsl
+
+
+class Throttle(object):
+    """
+    Pause shared by clients that hit the API rate limit
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.until = 0
+
+    def wait(self):
+        """
+        Sleep until the current pause is over
+        """
+        delay = self.until - time.time()
+
+        if delay > 0:
+            time.sleep(delay)
+
+    def pause(self, seconds):
+        """
+        Pause all requests for the given number of seconds
+        """
+        with self.lock:
+            self.until = max(self.until, time.time() + seconds)
 
 
 class SigSciApi(object):
     """
     Class for Signal Sciences API
     """
-    base_url = "https://dashboard.signalsciences.net/api/"
+    base_url = os.environ.get("SIGSCI_API_URL", "https://dashboard.signalsciences.net/api/")
     api_version = "v0"
     bearer_token = None
+    email = None
+    password = None
+    token_cache = None
+    auth_lock = None
     api_user = None
     api_token = None
     headers = dict()
     cookies = None
     corp = None
     site = None
+    mirror = None
+    transport = None
+    throttle = None
+
+    # (pre, post) request hooks, see add_request_hook
+    request_hooks = None
+
+    # times a rate limited (429) request is retried
+    retries = 3
+
+    # number of sites worked on concurrently by map_sites
+    workers = 8
 
     # endpoints
     ep_auth = "/auth"
     ep_auth_logout = ep_auth + "/logout"
     ep_corps = "/corps"
 
-    def __init__(self, email=None, password=None, api_token=None):
+    def __init__(self, email=None, password=None, api_token=None, token_cache=None,
+                 transport=None):
         """
         sigsciapi
+        With a token_cache, a cached bearer token for email is used instead of logging in
+        transport sends the HTTP requests: a Transport, or the name of one (requests,
+        urllib3 or httpx), defaulting to the PYSIGSCI_TRANSPORT environment variable
         """
+        self.transport = transport
+
         if email is not None and password is not None:
-            self.auth(email, password)
+            self.token_cache = token_cache
+            self.auth_lock = threading.Lock()
+
+            if token_cache is not None:
+                self.bearer_token = token_cache.get(email)
+
+            if self.bearer_token is not None:
+                self.email = email
+                self.password = password
+            else:
+                self.auth(email, password)
         elif email is not None and api_token is not None:
             self.api_user = email
             self.api_token = api_token
@@ -41,7 +109,7 @@ class SigSciApi(object):
                       data=None,
                       json=None,
                       method="GET"):
-        headers = self.headers
+        headers = dict(self.headers)
         cookies = None
 
         if endpoint != self.ep_auth and self.bearer_token is not None:
@@ -56,29 +124,57 @@ class SigSciApi(object):
         if self.cookies is not None:
             cookies = self.cookies
 
+        if method == "GET" and not params and self.mirror is not None:
+            mirrored = self.mirror.lookup(endpoint)
+
+            if mirrored is not None:
+                return mirrored
+
         url = self.base_url + self.api_version + endpoint
+        transport = self.get_transport()
+        reauthenticated = False
+        call = None
 
-        result = None
-        if method == "GET":
-            result = requests.get(url, params=params, headers=headers, cookies=cookies)
-        elif method == "POST":
-            headers["Content-Type"] = "application/x-www-form-urlencoded"
-            result = requests.post(url, data=data, headers=headers, cookies=cookies)
-        elif method == "POST_JSON":
-            headers["Content-Type"] = "application/json"
-            result = requests.post(url, json=json, headers=headers, cookies=cookies)
-        elif method == "PUT":
-            headers["Content-Type"] = "application/json"
-            result = requests.put(url, json=json, headers=headers, cookies=cookies)
-        elif method == "PATCH":
-            headers["Content-Type"] = "application/json"
-            result = requests.patch(url, json=json, headers=headers, cookies=cookies)
-        elif method == "DELETE":
-            headers["Content-Type"] = "application/json"
-            result = requests.delete(url, params=params, headers=headers, cookies=cookies)
-        else:
-            raise Exception("InvalidRequestMethod: " + str(method))
+        if self.request_hooks:
+            call = self._call_started(method, endpoint, url)
+
+        for attempt in range(self.retries + 1):
+            self.throttle.wait()
+
+            try:
+                result = transport.send(method, url, params, data, json, headers, cookies)
+            except Exception as error:
+                if call is not None:
+                    self._call_finished(call, None, attempt, error)
+                raise
+
+            # expired token, log in again once and retry
+            if result.status_code == 401 and not reauthenticated and \
+                    endpoint != self.ep_auth and self.password is not None:
+                reauthenticated = True
+
+                if self.reauthenticate(headers.get("Authorization")):
+                    headers["Authorization"] = "Bearer {}".format(self.bearer_token['token'])
+                    continue
 
+            if result.status_code != 429 or attempt == self.retries:
+                break
+
+            # rate limited, pause every client sharing this transport
+            try:
+                delay = float(result.headers.get('Retry-After'))
+            except (TypeError, ValueError):
+                delay = 2 ** attempt
+
+            self.throttle.pause(delay)
+
+        if call is not None:
+            return self._call_finished(call, result, attempt)
+
+        return self._decode(method, result)
+
+    @staticmethod
+    def _decode(method, result):
         if result.status_code == 204:
             return dict({'message': '{} {}'.format(method, 'successful.')})
 
@@ -87,6 +183,143 @@ class SigSciApi(object):
 
         return result.json()
 
+    def add_request_hook(self, pre=None, post=None):
+        """
+        Register functions called before and after each API request
+        Both receive the same call dict: method, endpoint, template (the endpoint with
+        names and ids replaced, e.g. /corps/{corp}/sites/{site}/rules) and url, and
+        after the request also status, latency and decode (seconds spent waiting for
+        and parsing the response), request_bytes, response_bytes, retries and error.
+        Clones made afterwards share the hooks
+        """
+        if self.request_hooks is None:
+            self.request_hooks = []
+
+        self.request_hooks.append((pre, post))
+
+    def _call_started(self, method, endpoint, url):
+        from pysigsci.metrics import endpoint_template
+
+        call = {'method': method, 'endpoint': endpoint,
+                'template': endpoint_template(endpoint), 'url': url}
+
+        for pre, _ in self.request_hooks:
+            if pre is not None:
+                pre(call)
+
+        call['started'] = time.time()
+        return call
+
+    def _call_finished(self, call, result, attempt, error=None):
+        # decodes the response, runs the post hooks and returns the decoded response
+        call['latency'] = time.time() - call.pop('started')
+        call['decode'] = 0.0
+        call['retries'] = attempt
+        call['status'] = None
+        call['request_bytes'] = 0
+        call['response_bytes'] = 0
+        response = None
+
+        if result is not None:
+            body = result.request.body if result.request is not None else None
+            call['status'] = result.status_code
+            call['request_bytes'] = len(body or '')
+            call['response_bytes'] = len(result.content or '')
+            started = time.time()
+
+            try:
+                response = self._decode(call['method'], result)
+            except Exception as decode_error:
+                error = decode_error
+
+            call['decode'] = time.time() - started
+
+        call['error'] = None if error is None else str(error)
+
+        for _, post in self.request_hooks:
+            if post is not None:
+                post(call)
+
+        if error is not None and result is not None:
+            raise error
+
+        return response
+
+    def get_transport(self):
+        """
+        Returns the HTTP transport, shared with clones of this client
+        A transport name is replaced by a new transport of that kind, see create_transport
+        """
+        if not isinstance(self.transport, Transport):
+            self.transport = create_transport(self.transport, pool_size=max(self.workers, 10))
+
+        if self.throttle is None:
+            self.throttle = Throttle()
+
+        return self.transport
+
+    def clone(self, site=None):
+        """
+        Returns a copy of this client for use in another thread
+        The copy shares credentials and the HTTP transport
+        """
+        self.get_transport()
+        client = copy.copy(self)
+
+        if site is not None:
+            client.site = site
+
+        return client
+
+    def map_sites(self, func, sites=None, workers=None):
+        """
+        Call func(client) for each site concurrently, each with its own client
+        Yields (site, result, error) tuples as sites complete
+        Defaults to all sites in the corp
+        """
+        if sites is None:
+            sites = [site['name'] for site in self.get_corp_sites()['data']]
+
+        sites = list(sites)
+
+        def call(site):
+            try:
+                return site, func(self.clone(site)), None
+            except Exception as error:
+                return site, None, error
+
+        if not sites:
+            return
+
+        pool = ThreadPool(min(workers or self.workers, len(sites)))
+        try:
+            for result in pool.imap_unordered(call, sites):
+                yield result
+        finally:
+            pool.close()
+            pool.join()
+
+    @staticmethod
+    def iter_pages(method, parameters=None):
+        """
+        Call a list method and follow "next" links, yielding each page
+        """
+        parameters = dict(parameters or {})
+
+        while True:
+            page = method(parameters=parameters)
+            yield page
+
+            next_uri = (page.get('next') or {}).get('uri') if isinstance(page, dict) else None
+
+            next_parameters = dict(parameters)
+            next_parameters.update(parse_qsl(urlparse(next_uri or '').query))
+
+            if not next_uri or next_parameters == parameters:
+                break
+
+            parameters = next_parameters
+
     def auth(self, email, password):
         """
         Log into the API
@@ -94,12 +327,55 @@ class SigSciApi(object):
         POST /auth
         """
         data = {"email": email, "password": password}
+
+        if self.auth_lock is None:
+            self.auth_lock = threading.Lock()
+
         self.bearer_token = self._make_request(
             endpoint=self.ep_auth,
             data=data,
             method="POST")
+
+        if 'token' in self.bearer_token:
+            self.email = email
+            self.password = password
+
+            if self.token_cache is not None:
+                self.token_cache.put(email, self.bearer_token)
+
         return True
 
+    def reauthenticate(self, authorization=None):
+        """
+        Log in again after the bearer token was rejected, returns True if a new token is set
+        authorization is the rejected Authorization header. Clones share the token,
+        so when another thread already replaced it, it is reused instead of logging in
+        """
+        with self.auth_lock:
+            current = "Bearer {}".format(self.bearer_token['token'])
+
+            if authorization is not None and authorization != current:
+                return True
+
+            response = self._make_request(
+                endpoint=self.ep_auth,
+                data={"email": self.email, "password": self.password},
+                method="POST")
+
+            if 'token' not in response:
+                if self.token_cache is not None:
+                    self.token_cache.remove(self.email)
+                return False
+
+            # updated in place, so clones of this client see the new token
+            self.bearer_token.clear()
+            self.bearer_token.update(response)
+
+            if self.token_cache is not None:
+                self.token_cache.put(self.email, self.bearer_token)
+
+            return True
+
     # CORPS
     def get_corps(self):
         """
@@ -777,12 +1053,13 @@ class SigSciApi(object):
             json=data,
             method="POST_JSON")
 
-    def delete_templated_rule(self, identifier):
+    def delete_templated_rule(self, identifier, templated_rule=None):
         """
-        Add Templated Rules
+        Delete Templated Rules
         WARNING: This is an undocumented endpoint. No support provided, and the
         endpoint may change.
         /corps/{corpName}/sites/{siteName}/configuredtemplates/{name}
+        Pass templated_rule, as returned by get_templated_rule(s), to skip fetching it
         """
         data = {
             "alertAdds": [],
@@ -792,7 +1069,8 @@ class SigSciApi(object):
             "detectionDeletes": [],
             "detectionUpdates": []
         }
-        templated_rule = self.get_templated_rule(identifier)
+        if templated_rule is None:
+            templated_rule = self.get_templated_rule(identifier)
 
         data['alertDeletes'] = templated_rule['alerts']
         data['detectionDeletes'] = templated_rule['detections']
@@ -957,6 +1235,7 @@ class SigSciApi(object):
                                                       self.site,
                                                       identifier),
             method="DELETE")
+
     def replace_site_rule_lists(self, identifier, data):
         """
         Replace a site list wholesale by ID
@@ -1041,6 +1320,96 @@ class SigSciApi(object):
             json=data,
             method="PUT")
 
+    @staticmethod
+    def read_entries(source):
+        """
+        Returns a list of unique entries from an iterable, or from a file path
+        with one entry per line. Blank lines and lines starting with # are skipped
+        """
+        if isinstance(source, str):
+            with open(source, 'r') as infile:
+                source = infile.read().splitlines()
+
+        entries = []
+        seen = set()
+
+        for entry in source:
+            entry = entry.strip()
+
+            if entry and not entry.startswith('#') and entry not in seen:
+                seen.add(entry)
+                entries.append(entry)
+
+        return entries
+
+    def sync_rule_list(self, identifier, entries, corp=False, chunk_size=1000,
+                       collapse=False):
+        """
+        Make a rule list contain exactly the given entries
+        The list is fetched once and only additions and deletions are sent,
+        as PATCH requests with at most chunk_size entries each
+        entries is an iterable of entries or a path to a file, see read_entries
+        For IP lists, collapse replaces the entries with the minimal covering CIDRs
+        Stops at the first chunk the API rejects: additions and deletions count the
+        applied changes, failed counts the rest and errors holds the API message
+        """
+        from pysigsci.sigsciapi import response_error
+
+        if corp:
+            current = self.get_corp_rule_list(identifier)
+            update = self.update_corp_rule_lists
+        else:
+            current = self.get_site_rule_list(identifier)
+            update = self.update_site_rule_lists
+
+        if 'entries' not in current:
+            raise Exception('Rule list {} not found: {}'.format(identifier,
+                                                                current.get('message')))
+
+        desired = self.read_entries(entries)
+
+        if collapse:
+            from pysigsci.ipset import IPSet
+            desired = IPSet(desired).cidrs()
+        existing = set(current['entries'] or [])
+        wanted = set(desired)
+        changes = [('deletions', entry) for entry in current['entries'] or []
+                   if entry not in wanted]
+        changes += [('additions', entry) for entry in desired if entry not in existing]
+        totals = dict((name, len([change for change in changes if change[0] == name]))
+                      for name in ['additions', 'deletions'])
+        applied = {'additions': 0, 'deletions': 0}
+        responses = []
+        errors = []
+
+        # deletions go first so the list never grows past its final size
+        for start in range(0, len(changes), chunk_size):
+            data = {'entries': {'additions': [], 'deletions': []}}
+
+            for change, entry in changes[start:start + chunk_size]:
+                data['entries'][change].append(entry)
+
+            response = update(identifier, data)
+            responses.append(response)
+            error = response_error(response)
+
+            if error is not None:
+                errors.append(error)
+                break
+
+            for change in applied:
+                applied[change] += len(data['entries'][change])
+
+        return {
+            'additions': applied['additions'],
+            'deletions': applied['deletions'],
+            'unchanged': len(existing & wanted),
+            'failed': dict((name, totals[name] - applied[name]) for name in totals),
+            'requests': len(responses),
+            'responses': responses,
+            'errors': errors
+        }
+
     # PRIVACY REDACTIONS
     def get_redactions(self):
         """
@@ -1388,7 +1757,7 @@ class SigSciApi(object):
             agent_alert_tagnames = [identifier]
 
         for alert in alerts:
-            if alert['tagName'] in agent_alert_tagnames:
+            if alert['tagName'] in agent_alert_tagnames and alert['enabled'] is not True:
                 alert['enabled'] = True
                 identifier = alert['id']
                 responses.append(self.update_custom_alert(identifier, alert))
@@ -1414,7 +1783,7 @@ class SigSciApi(object):
             alerts = self.get_custom_alerts()['data']
 
             for alert in alerts:
-                if alert['tagName'] in agent_alert_tagnames:
+                if alert['tagName'] in agent_alert_tagnames and alert['enabled'] is not True:
                     alert['enabled'] = True
                     identifier = alert['id']
                     response.append(
@@ -1438,7 +1807,7 @@ class SigSciApi(object):
             agent_alert_tagnames = [identifier]
 
         for alert in alerts:
-            if alert['tagName'] in agent_alert_tagnames:
+            if alert['tagName'] in agent_alert_tagnames and alert['enabled'] is not False:
                 alert['enabled'] = False
                 identifier = alert['id']
                 responses.append(self.update_custom_alert(identifier, alert))
@@ -1464,7 +1833,7 @@ class SigSciApi(object):
             alerts = self.get_custom_alerts()['data']
 
             for alert in alerts:
-                if alert['tagName'] in agent_alert_tagnames:
+                if alert['tagName'] in agent_alert_tagnames and alert['enabled'] is not False:
                     alert['enabled'] = False
                     identifier = alert['id']
                     responses.append(
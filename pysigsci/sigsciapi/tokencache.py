@@ -0,0 +1,95 @@
+"""
+Signal Sciences API bearer token cache
+"""
+
+import os
+import json
+import time
+import base64
+import tempfile
+import threading
+
+
+class TokenCache(object):
+    """
+    Bearer tokens kept on disk, keyed by email, so processes can skip logging in
+    The file is only readable by its owner
+    """
+
+    # seconds a token is reused when it does not carry its own expiry
+    ttl = 3600
+
+    def __init__(self, path=None):
+        if path is None:
+            path = os.path.join(os.path.expanduser('~'), '.pysigsci', 'tokens.json')
+
+        self.path = path
+        self.lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as infile:
+                return json.load(infile)
+        except (IOError, OSError, ValueError):
+            return {}
+
+    @staticmethod
+    def token_expiry(token):
+        """
+        Returns the exp claim of a JWT bearer token, or None
+        """
+        try:
+            payload = token.split('.')[1]
+            payload += '=' * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload).decode('utf-8'))['exp'])
+        except (IndexError, KeyError, TypeError, ValueError):
+            return None
+
+    def get(self, email):
+        """
+        Returns the cached auth response for email, or None if missing or expired
+        """
+        with self.lock:
+            entry = self._load().get(email)
+
+        # a minute of margin, so the token does not expire mid command
+        if entry is None or entry['expires'] - 60 < time.time():
+            return None
+
+        return entry['bearer_token']
+
+    def put(self, email, bearer_token):
+        """
+        Cache an auth response for email
+        """
+        expires = self.token_expiry(bearer_token['token']) or time.time() + self.ttl
+
+        with self.lock:
+            tokens = self._load()
+            tokens[email] = {'bearer_token': bearer_token, 'expires': expires}
+            self._save(tokens)
+
+    def remove(self, email):
+        """
+        Forget the token for email
+        """
+        with self.lock:
+            tokens = self._load()
+
+            if tokens.pop(email, None) is not None:
+                self._save(tokens)
+
+    def _save(self, tokens):
+        directory = os.path.dirname(self.path)
+
+        try:
+            if not os.path.isdir(directory):
+                os.makedirs(directory, 0o700)
+
+            # mkstemp creates the file with 0600 permissions
+            handle, temp_path = tempfile.mkstemp(dir=directory)
+            with os.fdopen(handle, 'w') as outfile:
+                json.dump(tokens, outfile)
+            os.rename(temp_path, self.path)
+        except (IOError, OSError):
+            pass
@@ -0,0 +1,596 @@
+"""
+Signal Sciences API HTTP transports
+"""
+
+import os
+import json
+import gzip
+import time
+import hashlib
+import threading
+from collections import deque
+
+try:
+    from urllib.parse import urlparse, parse_qsl, urlencode
+except ImportError:
+    from urlparse import urlparse, parse_qsl
+    from urllib import urlencode
+
+try:
+    from queue import Queue, Empty
+except ImportError:
+    from Queue import Queue, Empty
+
+# request and response fields replaced in cassettes
+REDACTED_FIELDS = ['email', 'password', 'token', 'apiToken', 'accessKey', 'secretKey']
+REDACTED = 'REDACTED'
+
+# response headers kept in cassettes
+RECORDED_HEADERS = ['Content-Type', 'Retry-After']
+
+CASSETTE_VERSION = 1
+
+# GET endpoint templates hedged by default, searches and reports with a long latency tail
+HEDGED_ENDPOINTS = [
+    '/corps/{corp}/sites/{site}/requests',
+    '/corps/{corp}/sites/{site}/timeseries/requests',
+    '/corps/{corp}/reports/attacks'
+]
+
+# transport used when none is given, overridden by PYSIGSCI_TRANSPORT
+DEFAULT_TRANSPORT = 'requests'
+
+
+class Transport(object):
+    """
+    Sends API requests for SigSciApi._make_request
+    send returns a response with status_code, headers, content, json() and
+    request.body, as requests does. Transports are shared by client clones
+    and must be thread safe
+    """
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        """
+        Send a request, method is GET, POST (form data), POST_JSON, PUT, PATCH or DELETE
+        """
+        raise NotImplementedError
+
+    def close(self):
+        """
+        Release connections and flush any state
+        """
+
+
+class RequestsTransport(Transport):
+    """
+    requests session with a connection pool of pool_size connections per host
+    """
+
+    def __init__(self, pool_size=10):
+        # imported on first use, so scripts start without loading requests
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        session = self.session
+
+        if method == "GET":
+            result = session.get(url, params=params, headers=headers, cookies=cookies)
+        elif method == "POST":
+            headers["Content-Type"] = "application/x-www-form-urlencoded"
+            result = session.post(url, data=data, headers=headers, cookies=cookies)
+        elif method == "POST_JSON":
+            headers["Content-Type"] = "application/json"
+            result = session.post(url, json=json, headers=headers, cookies=cookies)
+        elif method == "PUT":
+            headers["Content-Type"] = "application/json"
+            result = session.put(url, json=json, headers=headers, cookies=cookies)
+        elif method == "PATCH":
+            headers["Content-Type"] = "application/json"
+            result = session.patch(url, json=json, headers=headers, cookies=cookies)
+        elif method == "DELETE":
+            headers["Content-Type"] = "application/json"
+            result = session.delete(url, params=params, headers=headers, cookies=cookies)
+        else:
+            raise Exception("InvalidRequestMethod: " + str(method))
+
+        return result
+
+    def close(self):
+        self.session.close()
+
+
+def _encode(method, url, params, data, json_data, headers):
+    # returns the HTTP method, URL and body for a SigSciApi request method, and sets
+    # the content type as RequestsTransport does
+    if params:
+        url += ('&' if '?' in url else '?') + urlencode(params, doseq=True)
+
+    if method == "POST":
+        headers["Content-Type"] = "application/x-www-form-urlencoded"
+        return 'POST', url, urlencode(data or {}, doseq=True).encode('utf-8')
+
+    if method not in ["GET", "POST_JSON", "PUT", "PATCH", "DELETE"]:
+        raise Exception("InvalidRequestMethod: " + str(method))
+
+    headers["Content-Type"] = "application/json"
+    body = None
+
+    if json_data is not None and method != "GET":
+        body = json.dumps(json_data).encode('utf-8')
+
+    return method.replace('_JSON', ''), url, body
+
+
+def _with_cookies(headers, cookies):
+    if cookies:
+        headers = dict(headers, Cookie='; '.join('{}={}'.format(name, value)
+                                                 for name, value in cookies.items()))
+    return headers
+
+
+class Urllib3Transport(Transport):
+    """
+    urllib3 pool manager, skipping the request preparation and hooks of requests
+    Lower overhead per call with the same HTTP/1.1 connection reuse
+    """
+
+    def __init__(self, pool_size=10):
+        import urllib3
+
+        self.pool = urllib3.PoolManager(num_pools=2, maxsize=pool_size, retries=False)
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        headers = headers if headers is not None else {}
+        http_method, url, body = _encode(method, url, params, data, json, headers)
+        result = self.pool.request(http_method, url, body=body,
+                                   headers=_with_cookies(headers, cookies))
+        return Response(result.status, dict(result.headers), result.data, body)
+
+    def close(self):
+        self.pool.clear()
+
+
+class HttpxTransport(Transport):
+    """
+    httpx client, with HTTP/2 many concurrent calls share one connection to a host
+    HTTP/2 is negotiated over TLS, plain HTTP URLs use HTTP/1.1
+    Requires httpx, and h2 for HTTP/2: pip install pysigsci[http2]
+    """
+
+    def __init__(self, pool_size=10, http2=True):
+        import httpx
+
+        limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        # requests, the default transport, does not time out either
+        self.client = httpx.Client(http2=http2, limits=limits, timeout=None)
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        headers = headers if headers is not None else {}
+        http_method, url, body = _encode(method, url, params, data, json, headers)
+        result = self.client.request(http_method, url, content=body,
+                                     headers=_with_cookies(headers, cookies))
+        return Response(result.status_code, dict(result.headers), result.content, body)
+
+    def close(self):
+        self.client.close()
+
+
+# transport classes by name, for create_transport
+TRANSPORTS = {
+    'requests': RequestsTransport,
+    'urllib3': Urllib3Transport,
+    'httpx': HttpxTransport
+}
+
+
+def create_transport(name=None, pool_size=10):
+    """
+    Returns a new transport by name: requests, urllib3 or httpx
+    Defaults to the PYSIGSCI_TRANSPORT environment variable, then requests
+    """
+    name = name or os.environ.get('PYSIGSCI_TRANSPORT') or DEFAULT_TRANSPORT
+
+    if name not in TRANSPORTS:
+        raise ValueError('Unknown transport {}, expected one of {}'.format(
+            name, ', '.join(sorted(TRANSPORTS))))
+
+    return TRANSPORTS[name](pool_size=pool_size)
+
+
+def _compact(value):
+    # the send methods' json argument shadows the module there
+    return json.dumps(value, separators=(',', ':'))
+
+
+def redact(value):
+    """
+    Returns value with REDACTED_FIELDS replaced, at any depth
+    """
+    if isinstance(value, dict):
+        return dict((key, REDACTED if key in REDACTED_FIELDS else redact(item))
+                    for key, item in value.items())
+
+    if isinstance(value, list):
+        return [redact(item) for item in value]
+
+    return value
+
+
+def request_key(method, url, params=None, data=None, json_data=None):
+    """
+    Returns the cassette index key of a request, without host and credentials
+    e.g. GET /api/v0/corps/acme/sites?limit=100
+    """
+    parsed = urlparse(url)
+    query = parse_qsl(parsed.query) + sorted((params or {}).items())
+    key = '{} {}'.format(method, parsed.path)
+
+    if query:
+        key += '?' + urlencode(sorted((str(name), str(value)) for name, value in query))
+
+    body = request_body(data, json_data)
+
+    if body:
+        key += ' ' + hashlib.sha1(body.encode('utf-8')).hexdigest()[:16]
+
+    return key
+
+
+def request_body(data=None, json_data=None):
+    """
+    Returns the redacted request body as a string, or None
+    """
+    if data is not None:
+        return urlencode(sorted(redact(data).items()))
+
+    if json_data is not None:
+        return json.dumps(redact(json_data), sort_keys=True)
+
+    return None
+
+
+class _Headers(dict):
+    # case insensitive header lookups, like requests' headers
+    def get(self, name, default=None):
+        for key, value in self.items():
+            if key.lower() == name.lower():
+                return value
+
+        return default
+
+
+class _Request(object):
+    # the request attribute of a recorded response
+    def __init__(self, body):
+        self.body = body
+
+
+class Response(object):
+    """
+    Response of the transports other than requests, with the attributes SigSciApi uses
+    """
+
+    def __init__(self, status_code, headers, content, request_body=None):
+        self.status_code = status_code
+        self.headers = _Headers(headers)
+        self.content = content
+        self.text = content.decode('utf-8', 'replace')
+        self.request = _Request(request_body)
+
+    def json(self):
+        """
+        Decoded JSON body
+        """
+        return json.loads(self.text)
+
+
+def load_cassette(path):
+    """
+    Returns the content of a cassette file
+    """
+    with gzip.open(path, 'rb') as infile:
+        cassette = json.loads(infile.read().decode('utf-8'))
+
+    if cassette.get('version') != CASSETTE_VERSION:
+        raise Exception('Unsupported cassette version: {}'.format(cassette.get('version')))
+
+    return cassette
+
+
+class RecordingTransport(Transport):
+    """
+    Sends requests through another transport and records each request and response
+    to a gzipped JSON cassette, written by save() or close()
+    Credentials are not recorded: request headers are dropped, and REDACTED_FIELDS
+    in request and response bodies are replaced
+    """
+
+    def __init__(self, path, transport=None):
+        self.path = path
+        self.transport = transport if transport is not None else create_transport()
+        self.lock = threading.Lock()
+        self.interactions = []
+        self.index = {}
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        started = time.time()
+        result = self.transport.send(method, url, params, data, json, headers, cookies)
+        latency = time.time() - started
+
+        try:
+            response = _compact(redact(result.json()))
+        except ValueError:
+            response = result.text
+
+        interaction = {
+            'method': method,
+            'url': urlparse(url).path,
+            'status': result.status_code,
+            'headers': dict((name, result.headers.get(name)) for name in RECORDED_HEADERS
+                            if result.headers.get(name) is not None),
+            'body': request_body(data, json),
+            'response': response,
+            'latency': round(latency, 6)
+        }
+        key = request_key(method, url, params, data, json)
+
+        with self.lock:
+            self.index.setdefault(key, []).append(len(self.interactions))
+            self.interactions.append(interaction)
+
+        return result
+
+    def save(self):
+        """
+        Write the cassette
+        """
+        with self.lock:
+            cassette = {'version': CASSETTE_VERSION, 'recorded': int(time.time()),
+                        'index': self.index, 'interactions': self.interactions}
+            payload = _compact(cassette).encode('utf-8')
+
+        with gzip.open(self.path, 'wb') as outfile:
+            outfile.write(payload)
+
+    def close(self):
+        self.save()
+        self.transport.close()
+
+
+class ReplayTransport(Transport):
+    """
+    Serves responses from a cassette without network access
+    Repeated requests get the recorded responses in order, then the last one again.
+    Each response is delayed by its recorded latency times latency_scale
+    """
+
+    def __init__(self, path, latency_scale=0.0):
+        cassette = load_cassette(path)
+        self.path = path
+        self.latency_scale = latency_scale
+        self.interactions = cassette['interactions']
+        self.index = cassette['index']
+        self.lock = threading.Lock()
+        self.positions = {}
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        key = request_key(method, url, params, data, json)
+
+        with self.lock:
+            recorded = self.index.get(key)
+
+            if not recorded:
+                raise Exception('No recorded response for {} in {}'.format(key, self.path))
+
+            position = self.positions.get(key, 0)
+            self.positions[key] = min(position + 1, len(recorded) - 1)
+
+        interaction = self.interactions[recorded[position]]
+
+        if self.latency_scale:
+            time.sleep(interaction['latency'] * self.latency_scale)
+
+        return Response(interaction['status'], interaction['headers'],
+                        interaction['response'].encode('utf-8'), interaction['body'])
+
+
+class HedgingTransport(Transport):
+    """
+    Sends a duplicate of a hedged GET when it has not completed by the quantile of its
+    endpoint's observed latency, and returns whichever response arrives first
+    At most budget hedges are sent per hedged request, e.g. 0.05 adds up to 5% calls.
+    The quantile is taken from the last window latencies of an endpoint once it has
+    min_samples calls, all calls are also observed in the histogram.
+    Each primary attempt runs on its own thread, hedges share a pool of pool_size threads
+    and none is sent while all of them are busy
+    """
+
+    min_samples = 20
+    window = 1000
+
+    def __init__(self, transport=None, quantile=0.95, budget=0.05, endpoints=None,
+                 histogram=None, pool_size=20):
+        from pysigsci.metrics import LatencyHistogram
+
+        self.transport = transport if transport is not None else create_transport()
+        self.quantile = quantile
+        self.budget = budget
+        self.endpoints = set(endpoints if endpoints is not None else HEDGED_ENDPOINTS)
+        self.histogram = histogram if histogram is not None else LatencyHistogram()
+        self.pool_size = pool_size
+        self.pool = None
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.samples = {}
+        self.hedging = 0
+
+    @staticmethod
+    def template(url):
+        """
+        Returns the endpoint template of a request URL, without the API base path
+        """
+        from pysigsci.metrics import endpoint_template
+
+        path = urlparse(url).path
+        marker = path.find('/corps')
+        return endpoint_template(path[marker:] if marker >= 0 else path)
+
+    def send(self, method, url, params=None, data=None, json=None, headers=None,
+             cookies=None):
+        arguments = (method, url, params, data, json, headers, cookies)
+        template = self.template(url) if method == 'GET' else None
+
+        if template not in self.endpoints:
+            return self.transport.send(*arguments)
+
+        started = time.time()
+        delay = self.delay(template)
+
+        # requests are counted as they start, so concurrent calls share the hedge budget
+        with self.lock:
+            self._counts(template)['requests'] += 1
+
+        if delay is None:
+            result = self.transport.send(*arguments)
+            self._observe(template, started, result, False)
+            return result
+
+        results = Queue()
+        # the primary is never queued behind hedges or other primaries
+        primary = threading.Thread(target=self._attempt, args=(results, False, arguments))
+        primary.daemon = True
+        primary.start()
+
+        try:
+            hedge, result, error = results.get(timeout=delay)
+            hedged = False
+        except Empty:
+            hedged = self._take_hedge(template)
+
+            if hedged:
+                self._hedge(results, arguments)
+
+            hedge, result, error = results.get()
+
+        if error is not None and hedged:
+            # the other attempt may still succeed
+            hedge, result, error = results.get()
+
+        if error is not None:
+            raise error
+
+        self._observe(template, started, result, hedge)
+        return result
+
+    def delay(self, template):
+        """
+        Seconds to wait before hedging a call to an endpoint, None until min_samples calls
+        """
+        with self.lock:
+            samples = sorted(self.samples.get(template) or [])
+
+        if len(samples) < self.min_samples:
+            return None
+
+        return samples[min(int(self.quantile * len(samples)), len(samples) - 1)]
+
+    def _hedge(self, results, arguments):
+        with self.lock:
+            if self.pool is None:
+                from multiprocessing.pool import ThreadPool
+
+                self.pool = ThreadPool(self.pool_size)
+
+        self.pool.apply_async(self._attempt, (results, True, arguments))
+
+    def _attempt(self, results, hedge, arguments):
+        try:
+            results.put((hedge, self.transport.send(*arguments), None))
+        except Exception as error:
+            results.put((hedge, None, error))
+        finally:
+            if hedge:
+                with self.lock:
+                    self.hedging -= 1
+
+    def _counts(self, template):
+        counts = self.counts.get(template)
+
+        if counts is None:
+            counts = {'requests': 0, 'hedges': 0, 'wins': 0}
+            self.counts[template] = counts
+
+        return counts
+
+    def _take_hedge(self, template):
+        with self.lock:
+            requests = sum(counts['requests'] for counts in self.counts.values())
+            hedges = sum(counts['hedges'] for counts in self.counts.values())
+
+            # a hedge waiting for a pool thread would not return sooner
+            if hedges + 1 > self.budget * requests or self.hedging >= self.pool_size:
+                return False
+
+            self._counts(template)['hedges'] += 1
+            self.hedging += 1
+            return True
+
+    def _observe(self, template, started, result, hedge):
+        # the latency the caller saw, from the first attempt
+        latency = time.time() - started
+
+        with self.lock:
+            self._counts(template)['wins'] += 1 if hedge else 0
+
+            if template not in self.samples:
+                self.samples[template] = deque(maxlen=self.window)
+
+            self.samples[template].append(latency)
+
+        self.histogram.observe({'method': 'GET', 'template': template,
+                                'latency': latency,
+                                'status': result.status_code, 'request_bytes': 0,
+                                'response_bytes': len(result.content or b''), 'retries': 0})
+
+    def stats(self):
+        """
+        Returns hedged request, hedge and win counts per endpoint and in total, with
+        hedge_rate (hedges per request) and win_rate (hedges that returned first)
+        """
+        with self.lock:
+            endpoints = dict((template, dict(counts))
+                             for template, counts in self.counts.items())
+
+        totals = {'requests': 0, 'hedges': 0, 'wins': 0}
+
+        for counts in endpoints.values():
+            for name in totals:
+                totals[name] += counts[name]
+
+        totals['hedge_rate'] = round(float(totals['hedges']) / totals['requests'], 6) \
+            if totals['requests'] else 0.0
+        totals['win_rate'] = round(float(totals['wins']) / totals['hedges'], 6) \
+            if totals['hedges'] else 0.0
+        totals['endpoints'] = endpoints
+        return totals
+
+    def close(self):
+        with self.lock:
+            pool, self.pool = self.pool, None
+
+        if pool is not None:
+            pool.close()
+
+        self.transport.close()
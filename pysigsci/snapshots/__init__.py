@@ -0,0 +1,6 @@
+"""
+snapshots module
+"""
+
+from .snapshots import SnapshotStore
+from .snapshots import diff_manifests
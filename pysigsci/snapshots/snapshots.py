@@ -0,0 +1,175 @@
+"""
+Signal Sciences Configuration Snapshot Store
+"""
+
+import os
+import json
+import time
+import tempfile
+from collections import Counter
+from pysigsci.audit import SIGSCI_CONFIGS
+from pysigsci.audit import CONFIG_GETTERS
+from pysigsci.audit import normalize_config
+from pysigsci.audit import fingerprint_item
+
+
+def diff_manifests(manifest1, manifest2):
+    """
+    Compare two manifests, returns the item hashes added and removed per config
+    """
+    configs1 = manifest1['configs']
+    configs2 = manifest2['configs']
+    diff = {}
+
+    for config in sorted(set(configs1) | set(configs2)):
+        counts1 = Counter(configs1.get(config, []))
+        counts2 = Counter(configs2.get(config, []))
+        removed = sorted((counts1 - counts2).elements())
+        added = sorted((counts2 - counts1).elements())
+
+        if added or removed:
+            diff[config] = {'added': added, 'removed': removed}
+
+    return diff
+
+
+class SnapshotStore(object):
+    """
+    Content addressed store for site configuration snapshots
+    Each normalized config item is stored once by hash, and each snapshot
+    is a manifest of item hashes per config
+    """
+
+    def __init__(self, directory='/tmp/pysigsci/snapshots'):
+        self.directory = directory
+        self.objects_dir = os.path.join(directory, 'objects')
+        self.manifests_dir = os.path.join(directory, 'manifests')
+
+    def _object_path(self, digest):
+        return os.path.join(self.objects_dir, digest[:2], '{}.json'.format(digest))
+
+    def _manifest_path(self, site, timestamp):
+        return os.path.join(self.manifests_dir, site, '{}.json'.format(timestamp))
+
+    @staticmethod
+    def _write(path, data):
+        directory = os.path.dirname(path)
+
+        if not os.path.exists(directory):
+            os.makedirs(directory)
+
+        # write then rename so readers never see a partial file
+        handle, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(handle, 'w') as outfile:
+            json.dump(data, outfile, sort_keys=True, separators=(',', ':'))
+        os.rename(temp_path, path)
+
+    def put_object(self, item):
+        """
+        Store a normalized config item, returns its hash
+        """
+        digest = fingerprint_item(item)
+        path = self._object_path(digest)
+
+        if not os.path.exists(path):
+            self._write(path, item)
+
+        return digest
+
+    def get_object(self, digest):
+        """
+        Load a config item by hash
+        """
+        with open(self._object_path(digest), 'r') as infile:
+            return json.load(infile)
+
+    def save(self, site, configs, timestamp=None):
+        """
+        Store a snapshot for a site
+        configs is a dict of config name to the API response for that config
+        """
+        if timestamp is None:
+            timestamp = time.strftime('%Y%m%dT%H%M%SZ', time.gmtime())
+
+        manifest = {'site': site, 'timestamp': timestamp, 'configs': {}}
+
+        for config, response in configs.items():
+            items = normalize_config(response.get('data'))
+            manifest['configs'][config] = sorted(self.put_object(item) for item in items)
+
+        self._write(self._manifest_path(site, timestamp), manifest)
+
+        return manifest
+
+    def snapshot_site(self, sigsci, site, configs=None, timestamp=None):
+        """
+        Retrieve configs for a site from the API and store a snapshot
+        """
+        if configs is None:
+            configs = SIGSCI_CONFIGS
+
+        sigsci.site = site
+        responses = dict((config, getattr(sigsci, CONFIG_GETTERS[config])())
+                         for config in configs)
+
+        return self.save(site, responses, timestamp)
+
+    def sites(self):
+        """
+        List sites with at least one snapshot
+        """
+        if not os.path.exists(self.manifests_dir):
+            return []
+
+        return sorted(os.listdir(self.manifests_dir))
+
+    def history(self, site):
+        """
+        List snapshot timestamps for a site, oldest first
+        """
+        directory = os.path.join(self.manifests_dir, site)
+
+        if not os.path.exists(directory):
+            return []
+
+        return sorted(name[:-len('.json')] for name in os.listdir(directory)
+                      if name.endswith('.json'))
+
+    def load(self, site, timestamp=None):
+        """
+        Load a snapshot manifest, the latest one if no timestamp is given
+        """
+        if timestamp is None:
+            history = self.history(site)
+
+            if not history:
+                raise Exception('No snapshots for site {}'.format(site))
+
+            timestamp = history[-1]
+
+        with open(self._manifest_path(site, timestamp), 'r') as infile:
+            return json.load(infile)
+
+    def resolve(self, reference):
+        """
+        Load a snapshot by reference, either "site" or "site@timestamp"
+        """
+        if '@' in reference:
+            site, timestamp = reference.split('@', 1)
+            return self.load(site, timestamp)
+
+        return self.load(reference)
+
+    def diff(self, reference1, reference2, items=False):
+        """
+        Compare two snapshots by reference
+        When items is True, hashes are replaced by the stored config items
+        """
+        diff = diff_manifests(self.resolve(reference1), self.resolve(reference2))
+
+        if items:
+            for changes in diff.values():
+                for change in ['added', 'removed']:
+                    changes[change] = [self.get_object(digest) for digest in changes[change]]
+
+        return diff
@@ -0,0 +1,7 @@
+"""
+standin module
+"""
+
+from .standin import DataSet
+from .standin import StandInServer
+from .standin import main
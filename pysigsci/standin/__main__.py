@@ -0,0 +1,7 @@
+"""
+python -m pysigsci.standin
+"""
+
+from .standin import main
+
+main()
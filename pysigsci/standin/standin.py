@@ -0,0 +1,734 @@
+"""
+Local Signal Sciences API stand-in server, for offline testing and benchmarking
+"""
+
+from __future__ import print_function
+import re
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+
+try:
+    from http.server import HTTPServer, BaseHTTPRequestHandler
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import HTTPServer, BaseHTTPRequestHandler
+    from SocketServer import ThreadingMixIn
+
+try:
+    from urllib.parse import urlparse, parse_qsl, urlencode
+except ImportError:
+    from urlparse import urlparse, parse_qsl
+    from urllib import urlencode
+
+API_PREFIX = '/api/v0'
+DEFAULT_CORP = 'testcorp'
+SIGNALS = ['SQLI', 'XSS', 'CMDEXE', 'TRAVERSAL', 'BACKDOOR', 'USERAGENT', 'SCANNER',
+           'HTTP4XX', 'NOTFOUND', 'SANS']
+MODULE_TYPES = ['sigsci-module-nginx-native', 'sigsci-module-apache', 'sigsci-module-golang',
+                'sigsci-module-python', 'sigsci-module-nodejs']
+
+# path pairs that name one collection, e.g. /feed/requests
+COMPOUND = [('feed', 'requests'), ('timeseries', 'requests'), ('analytics', 'events'),
+            ('top', 'attacks'), ('reports', 'attacks')]
+
+# records generated from their index on every read, so volume costs no memory
+VIRTUAL = ['requests', 'feed/requests', 'analytics/events', 'activity']
+
+# fields that identify an item in its collection's URLs
+ITEM_KEYS = ['id', 'name', 'tagName', 'field', 'email', 'source', 'shortName']
+
+PAGE_LIMIT = 100
+
+
+def _random(*parts):
+    # deterministic generator for a record, independent of PYTHONHASHSEED
+    return random.Random(zlib.crc32('/'.join(str(part) for part in parts).encode('utf-8')))
+
+
+def _object_id(rng):
+    return '{:024x}'.format(rng.getrandbits(96))
+
+
+def _ip(rng):
+    return '{}.{}.{}.{}'.format(rng.randint(1, 223), rng.randint(0, 255),
+                                rng.randint(0, 255), rng.randint(1, 254))
+
+
+def _timestamp(seconds):
+    return time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(seconds))
+
+
+def _epoch(value, default):
+    # epoch seconds, or relative to now as in the API, e.g. -1h
+    if not value:
+        return default
+
+    if value.startswith('-') and value[-1] in 'smhd':
+        unit = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[value[-1]]
+        return int(time.time()) - int(value[1:-1]) * unit
+
+    return int(value)
+
+
+class DataSet(object):
+    """
+    Generated corp data, mutated in memory by write requests
+    """
+
+    def __init__(self, sites=10, events=200, requests=5000, agents=5, seed=1):
+        self.sites = sites
+        self.events = events
+        self.requests = requests
+        self.agents = agents
+        self.seed = seed
+        self.now = int(time.time())
+        self.lock = threading.RLock()
+        self.corps = {}
+        self.collections = {}
+
+    def corp(self, corp):
+        """
+        Returns a corp's record and site records, any corp name exists
+        """
+        with self.lock:
+            if corp not in self.corps:
+                sites = {}
+
+                for index in range(self.sites):
+                    name = 'site-{}'.format(index)
+                    sites[name] = {'name': name, 'displayName': 'Site {}'.format(index),
+                                   'agentLevel': 'block', 'blockDurationSeconds': 86400,
+                                   'created': _timestamp(self.now - 86400 * 365)}
+
+                self.corps[corp] = {
+                    'record': {'name': corp, 'displayName': corp.title(),
+                               'created': _timestamp(self.now - 86400 * 730),
+                               'sessionMaxAgeDashboard': 1209600},
+                    'sites': sites
+                }
+
+            return self.corps[corp]
+
+    def collection(self, corp, site, name):
+        """
+        Returns the item list of a stored collection, generating it on first use
+        """
+        key = (corp, site, name)
+
+        with self.lock:
+            if key not in self.collections:
+                self.collections[key] = self._generate(corp, site, name)
+
+            return self.collections[key]
+
+    def _generate(self, corp, site, name):
+        rng = _random(self.seed, corp, site, name)
+        scope = 'site' if site is not None else 'corp'
+        created = _timestamp(self.now - 86400 * 30)
+
+        if name == 'rules':
+            return [{'id': _object_id(rng), 'type': 'request', 'enabled': True,
+                     'groupOperator': 'all', 'reason': '', 'expiration': '',
+                     'description': '{} rule {}'.format(scope, index),
+                     'conditions': [{'type': 'single', 'field': 'ip', 'operator': 'equals',
+                                     'value': _ip(rng)}],
+                     'actions': [{'type': 'block'}], 'created': created}
+                    for index in range(rng.randint(3, 8))]
+
+        if name == 'lists':
+            return [{'id': '{}.list-{}'.format(scope, index), 'name': 'list-{}'.format(index),
+                     'type': 'ip', 'description': '', 'entries': [_ip(rng) for _ in range(50)],
+                     'created': created}
+                    for index in range(rng.randint(2, 5))]
+
+        if name == 'tags':
+            return [{'tagName': '{}.signal-{}'.format(scope, index),
+                     'shortName': 'signal-{}'.format(index),
+                     'longName': 'Signal {}'.format(index), 'description': '',
+                     'configurable': False, 'informational': True, 'needsResponse': False,
+                     'createdBy': 'standin@example.com', 'created': created}
+                    for index in range(rng.randint(2, 6))]
+
+        if name == 'alerts':
+            alerts = [{'id': _object_id(rng), 'tagName': tag, 'longName': '{} alert'.format(tag),
+                       'interval': 10, 'threshold': 25, 'enabled': True, 'action': 'flagged',
+                       'created': created}
+                      for tag in rng.sample(SIGNALS, 4)]
+            alerts.append({'id': _object_id(rng), 'tagName': 'requests_total', 'type': 'agent',
+                           'longName': 'Agent requests', 'interval': 5, 'threshold': 0,
+                           'enabled': False, 'action': 'info', 'created': created})
+            return alerts
+
+        if name in ['whitelist', 'blacklist']:
+            return [{'id': _object_id(rng), 'source': _ip(rng), 'note': 'Generated',
+                     'expires': '', 'createdBy': 'standin@example.com', 'created': created}
+                    for _ in range(rng.randint(5, 20))]
+
+        if name == 'redactions':
+            return [{'id': _object_id(rng), 'field': field, 'redactionType': 0,
+                     'created': created} for field in ['password', 'ssn', 'token']]
+
+        if name == 'headerLinks':
+            return [{'id': _object_id(rng), 'type': 'request', 'name': 'X-Request-Id',
+                     'linkName': 'Trace', 'link': 'https://tracing.example.com/{{value}}'}]
+
+        if name == 'integrations':
+            return [{'id': _object_id(rng), 'type': 'slack',
+                     'url': 'https://hooks.slack.com/services/{}'.format(index),
+                     'events': ['listCreated'], 'active': True, 'created': created}
+                    for index in range(rng.randint(0, 2))]
+
+        if name == 'agents':
+            return [{'agent.name': '{}-agent-{}'.format(site, index),
+                     'agent.status': 'online', 'agent.version': '4.{}.0'.format(rng.randint(20, 40)),
+                     'module.type': rng.choice(MODULE_TYPES),
+                     'module.version': '1.{}.0'.format(rng.randint(0, 9)),
+                     'host.remote_addr': _ip(rng), 'agent.last_seen': _timestamp(self.now)}
+                    for index in range(self.agents)]
+
+        if name == 'events':
+            return [{'id': _object_id(rng), 'timestamp': _timestamp(self.now - 60 * index),
+                     'source': _ip(rng), 'remoteCountryCode': rng.choice(['US', 'DE', 'CN', 'BR']),
+                     'action': 'flagged', 'type': 'attack', 'reasons': {rng.choice(SIGNALS): 1},
+                     'requestCount': rng.randint(1, 500), 'tagCount': 1, 'window': 60,
+                     'expires': _timestamp(self.now + 86400), 'isExpired': False,
+                     'blockedRequestCount': 0}
+                    for index in range(self.events)]
+
+        if name == 'configuredtemplates':
+            return [{'name': 'LOGINATTEMPT', 'detections': [], 'alerts': []}]
+
+        if name == 'advancedRules':
+            return [{'id': _object_id(rng), 'name': 'advanced-{}'.format(index),
+                     'shortName': 'advanced-{}'.format(index), 'enabled': True}
+                    for index in range(rng.randint(0, 2))]
+
+        if name == 'users':
+            return [{'email': 'user{}@example.com'.format(index), 'name': 'User {}'.format(index),
+                     'role': 'user', 'status': 'active'} for index in range(5)]
+
+        return []
+
+    def record(self, corp, site, name, index):
+        """
+        Generate one record of a virtual collection
+        """
+        rng = _random(self.seed, corp, site, name, index)
+        seconds = self.now - index
+
+        if name == 'activity' or name == 'analytics/events':
+            return {'id': _object_id(rng), 'eventType': rng.choice(['listUpdated', 'ruleCreated',
+                                                                    'agentAlert']),
+                    'msgData': {}, 'message': 'Generated activity', 'created': _timestamp(seconds),
+                    'userId': 'standin@example.com'}
+
+        path = rng.choice(['/', '/login', '/search', '/api/items', '/static/app.js'])
+        return {
+            'id': _object_id(rng),
+            'serverHostname': '{}.example.com'.format(site),
+            'remoteIP': _ip(rng),
+            'remoteHostname': '',
+            'remoteCountryCode': rng.choice(['US', 'DE', 'CN', 'BR', 'IN']),
+            'userAgent': 'Mozilla/5.0 (standin)',
+            'timestamp': _timestamp(seconds),
+            'method': rng.choice(['GET', 'GET', 'GET', 'POST']),
+            'serverName': '{}.example.com'.format(site),
+            'protocol': 'HTTP/1.1',
+            'path': path,
+            'uri': '{}?q={}'.format(path, rng.randint(0, 1000)),
+            'responseCode': rng.choice([200, 200, 200, 301, 404, 406, 500]),
+            'responseSize': rng.randint(100, 100000),
+            'responseMillis': rng.randint(1, 900),
+            'agentResponseCode': rng.choice([200, 406]),
+            'tags': [{'type': signal, 'location': 'QUERYSTRING', 'value': '<script>',
+                      'detector': signal}
+                     for signal in rng.sample(SIGNALS, rng.randint(0, 2))],
+            'headersIn': [['Host', '{}.example.com'.format(site)],
+                          ['Accept', '*/*']],
+            'headersOut': [['Content-Type', 'text/html']]
+        }
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """
+    Routes API requests to the data set of the server
+    """
+    protocol_version = 'HTTP/1.1'
+
+    # headers and body are written separately, without this keep-alive
+    # connections stall on delayed ACKs
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.count_outcome('connections')
+
+    def log_message(self, *args):
+        if self.server.verbose:
+            BaseHTTPRequestHandler.log_message(self, *args)
+
+    def _reply(self, status, body=None, headers=None):
+        payload = b'' if body is None else json.dumps(body).encode('utf-8')
+        self.send_response(status)
+
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+
+        if body is not None:
+            self.send_header('Content-Type', 'application/json')
+
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+
+        if not length:
+            return None
+
+        raw = self.rfile.read(length).decode('utf-8')
+
+        try:
+            return json.loads(raw)
+        except ValueError:
+            return dict(parse_qsl(raw))
+
+    def _handle(self):
+        parsed = urlparse(self.path)
+        body = self._body()
+        server = self.server
+        server.count(self.command, parsed.path)
+
+        if server.latency or server.jitter:
+            time.sleep(server.latency + server.random.uniform(0, server.jitter))
+
+        if server.slow_rate and server.random.random() < server.slow_rate:
+            time.sleep(server.slow_latency)
+
+        if not server.take_token():
+            server.count_outcome('throttled')
+            self._reply(429, {'message': 'Rate limit exceeded'},
+                        {'Retry-After': str(server.retry_after)})
+            return
+
+        if server.error_rate and server.random.random() < server.error_rate:
+            server.count_outcome('errors')
+            self._reply(500, {'message': 'Injected error'})
+            return
+
+        if not parsed.path.startswith(API_PREFIX):
+            self._reply(404, {'message': 'Not found'})
+            return
+
+        segments = [segment for segment in parsed.path[len(API_PREFIX):].split('/') if segment]
+        params = dict(parse_qsl(parsed.query))
+
+        try:
+            status, response = server.route(self.command, segments, params, body)
+        except (KeyError, ValueError, TypeError) as error:
+            status, response = 400, {'message': 'Bad request: {}'.format(error)}
+
+        self._reply(status, response)
+
+    do_GET = _handle
+    do_POST = _handle
+    do_PUT = _handle
+    do_PATCH = _handle
+    do_DELETE = _handle
+
+
+class StandInServer(ThreadingMixIn, HTTPServer):
+    """
+    Threaded HTTP server implementing the endpoint shapes used by SigSciApi
+    Paged collections (requests, feed, events, activity) return "next" links,
+    every response can be delayed by latency plus up to jitter seconds, a fraction
+    slow_rate of responses by another slow_latency seconds (a latency tail), requests
+    over rate_limit per second get 429 responses and a fraction error_rate of
+    requests fail with a 500. stats counts requests per method and endpoint,
+    outcomes counts throttled and failed requests and accepted connections
+    """
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port=0, host='127.0.0.1', latency=0.0, jitter=0.0, rate_limit=None,
+                 error_rate=0.0, verbose=False, **data):
+        HTTPServer.__init__(self, (host, port), StandInHandler)
+        self.data = DataSet(**data)
+        self.latency = latency
+        self.jitter = jitter
+        self.rate_limit = rate_limit
+        self.retry_after = 1
+        self.error_rate = error_rate
+        self.slow_rate = 0.0
+        self.slow_latency = 0.0
+        self.verbose = verbose
+        self.random = random.Random(self.data.seed)
+        self.lock = threading.Lock()
+        self.tokens = float(rate_limit or 0)
+        self.refilled = time.time()
+        self.stats = {}
+        self.outcomes = {'throttled': 0, 'errors': 0, 'connections': 0}
+        self.thread = None
+
+    @property
+    def url(self):
+        """
+        Base URL to use as SigSciApi.base_url or SIGSCI_API_URL
+        """
+        return 'http://{}:{}/api/'.format(self.server_address[0], self.server_address[1])
+
+    def start(self):
+        """
+        Serve in a background thread, returns self
+        """
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop serving and close the socket
+        """
+        self.shutdown()
+        self.server_close()
+
+    def client(self, corp=DEFAULT_CORP, site='site-0'):
+        """
+        Returns a SigSciApi client for this server
+        """
+        from pysigsci.sigsciapi import SigSciApi
+
+        sigsci = SigSciApi(email='standin@example.com', api_token='standin')
+        sigsci.base_url = self.url
+        sigsci.corp = corp
+        sigsci.site = site
+        return sigsci
+
+    def count(self, method, path):
+        """
+        Count a request by method and endpoint template
+        """
+        from pysigsci.metrics import endpoint_template
+
+        key = '{} {}'.format(method, endpoint_template(path[len(API_PREFIX):] or '/'))
+
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + 1
+
+    def count_outcome(self, outcome):
+        """
+        Count a throttled or failed request, or an accepted connection
+        """
+        with self.lock:
+            self.outcomes[outcome] += 1
+
+    def reset_stats(self):
+        """
+        Clear request counts
+        """
+        with self.lock:
+            self.stats = {}
+            self.outcomes = {'throttled': 0, 'errors': 0, 'connections': 0}
+
+    def take_token(self):
+        """
+        Token bucket for rate_limit, returns False when the request is throttled
+        """
+        if not self.rate_limit:
+            return True
+
+        with self.lock:
+            now = time.time()
+            self.tokens = min(float(self.rate_limit),
+                              self.tokens + (now - self.refilled) * self.rate_limit)
+            self.refilled = now
+
+            if self.tokens < 1:
+                return False
+
+            self.tokens -= 1
+            return True
+
+    def route(self, method, segments, params, body):
+        """
+        Returns (status, response body) for an API request
+        """
+        if segments[:1] == ['auth']:
+            if segments[1:] == ['logout']:
+                return 204, None
+            token = 'standin.{}.token'.format(_object_id(_random(time.time())))
+            return 200, {'token': token}
+
+        if segments == ['corps']:
+            corps = sorted(set([DEFAULT_CORP] + list(self.data.corps)))
+            return 200, {'data': [self.data.corp(corp)['record'] for corp in corps]}
+
+        if segments[:1] != ['corps'] or len(segments) < 2:
+            return 404, {'message': 'Not found'}
+
+        corp = self.data.corp(segments[1])
+
+        if len(segments) == 2:
+            if method == 'PATCH':
+                corp['record'].update(body or {})
+            return 200, corp['record']
+
+        site = None
+        rest = segments[2:]
+
+        if rest[0] == 'sites':
+            if len(rest) == 1:
+                if method == 'POST':
+                    record = dict(body, created=_timestamp(time.time()))
+                    corp['sites'][record['name']] = record
+                    return 200, record
+                return 200, {'data': [corp['sites'][name] for name in sorted(corp['sites'])]}
+
+            site = rest[1]
+
+            if site not in corp['sites']:
+                return 404, {'message': 'Site not found'}
+
+            if len(rest) == 2:
+                if method == 'PATCH':
+                    corp['sites'][site].update(body or {})
+                return 200, corp['sites'][site]
+
+            rest = rest[2:]
+
+        name = rest[0]
+
+        if tuple(rest[:2]) in COMPOUND:
+            name = '/'.join(rest[:2])
+            rest = [name] + rest[2:]
+
+        return self._collection(method, segments[1], site, name, rest[1:], params, body)
+
+    def _collection(self, method, corp, site, name, rest, params, body):
+        if name in VIRTUAL:
+            return 200, self._virtual_page(corp, site, name, params)
+
+        if name == 'timeseries/requests':
+            return 200, self._timeseries(site, params)
+
+        if name == 'top/attacks':
+            return 200, {'topAttacks': self._attack_counts(corp, site), 'totalCount': 5}
+
+        if name == 'reports/attacks':
+            return 200, {'data': [self._overview(corp, name) for name in
+                                  sorted(self.data.corp(corp)['sites'])]}
+
+        if name == 'suspiciousIPs':
+            return 200, {'data': self._suspicious_ips(corp, site)}
+
+        items = self.data.collection(corp, site, name)
+
+        if not rest:
+            if method == 'GET':
+                if name == 'events':
+                    return 200, self._events_page(items, params)
+                return 200, {'data': list(items)}
+
+            if method in ['POST', 'PUT']:
+                return 200, self._add(corp, site, name, items, body)
+
+            return 405, {'message': 'Method not allowed'}
+
+        with self.data.lock:
+            item = self._find(items, rest[0])
+
+            # actions on an item, e.g. events/{id}/expire or users/{email}/invite
+            if len(rest) > 1:
+                if rest[1] == 'fromSite':
+                    source = self._find(self.data.collection(corp, rest[2], name), rest[0])
+                    if source is None:
+                        return 404, {'message': 'Not found'}
+                    copied = dict(source, id=_object_id(_random(time.time(), rest[0])))
+                    items.append(copied)
+                    return 200, copied
+
+                if item is None:
+                    return 404, {'message': 'Not found'}
+
+                if rest[1] == 'expire':
+                    item['isExpired'] = True
+                    return 200, item
+
+                return 200, {'data': []} if method == 'GET' else item
+
+            if method == 'GET':
+                return (200, item) if item is not None else (404, {'message': 'Not found'})
+
+            if method == 'DELETE':
+                if item is None:
+                    return 404, {'message': 'Not found'}
+                items.remove(item)
+                return 204, None
+
+            if item is None:
+                # upsert by name, e.g. configuredtemplates/{name}
+                item = {'name': rest[0]}
+                items.append(item)
+
+            if name == 'configuredtemplates':
+                item['detections'] = item.get('detections', []) + body.get('detectionAdds', [])
+                item['alerts'] = item.get('alerts', []) + body.get('alertAdds', [])
+            elif name == 'lists' and isinstance((body or {}).get('entries'), dict):
+                removed = set(body['entries'].get('deletions') or [])
+                item['entries'] = [entry for entry in item.get('entries', [])
+                                   if entry not in removed]
+                item['entries'].extend(entry for entry in body['entries'].get('additions') or []
+                                       if entry not in item['entries'])
+            else:
+                item.update(body or {})
+
+            item['updated'] = _timestamp(time.time())
+            return 200, item
+
+    @staticmethod
+    def _find(items, key):
+        for item in items:
+            for field in ITEM_KEYS:
+                if item.get(field) == key:
+                    return item
+
+        return None
+
+    def _add(self, corp, site, name, items, body):
+        scope = 'site' if site is not None else 'corp'
+        item = dict(body or {})
+        item.setdefault('id', _object_id(_random(time.time(), corp, site, name, len(items))))
+        item['created'] = _timestamp(time.time())
+
+        if name == 'tags':
+            del item['id']
+            item['tagName'] = '{}.{}'.format(scope, item['shortName'])
+            item.setdefault('longName', item['shortName'])
+        elif name == 'lists':
+            item['id'] = '{}.{}'.format(scope, re.sub(r'[^a-z0-9]+', '-', item['name'].lower()))
+
+        with self.data.lock:
+            if name in ['whitelist', 'blacklist'] and \
+                    [entry for entry in items if entry.get('source') == item.get('source')]:
+                raise ValueError('{} already exists'.format(item.get('source')))
+
+            items.append(item)
+
+        return item
+
+    def _page(self, total, params, record, uri):
+        limit = min(int(params.get('limit') or PAGE_LIMIT), 1000)
+        page = max(int(params.get('page') or 1), 1)
+        start = (page - 1) * limit
+        data = [record(index) for index in range(start, min(start + limit, total))]
+        next_uri = ''
+
+        if start + limit < total:
+            next_uri = '{}?{}'.format(uri, urlencode(sorted(dict(params, page=page + 1,
+                                                                 limit=limit).items())))
+
+        return {'totalCount': total, 'next': {'uri': next_uri}, 'data': data}
+
+    def _virtual_page(self, corp, site, name, params):
+        total = self.data.requests if name in ['requests', 'feed/requests'] else self.data.events
+        uri = '{}/corps/{}{}/{}'.format(API_PREFIX, corp,
+                                        '/sites/{}'.format(site) if site else '', name)
+        return self._page(total, params,
+                          lambda index: self.data.record(corp, site, name, index), uri)
+
+    def _events_page(self, items, params):
+        with self.data.lock:
+            matches = [item for item in items
+                       if (params.get('status') != 'active' or not item['isExpired']) and
+                       (params.get('status') != 'expired' or item['isExpired']) and
+                       params.get('tag', next(iter(item['reasons']))) in item['reasons'] and
+                       params.get('ip', item['source']) == item['source']]
+
+        return self._page(len(matches), params, lambda index: matches[index], '')
+
+    def _attack_counts(self, corp, site):
+        rng = _random(self.data.seed, corp, site, 'attacks')
+        return [{'value': signal, 'label': signal, 'count': rng.randint(1, 10000)}
+                for signal in rng.sample(SIGNALS, 5)]
+
+    def _overview(self, corp, site):
+        attacks = self._attack_counts(corp, site)
+        rng = _random(self.data.seed, corp, site, 'overview')
+        attack_count = sum(attack['count'] for attack in attacks)
+        return {'siteName': site, 'totalCount': attack_count * rng.randint(10, 100),
+                'flaggedCount': attack_count, 'attackCount': attack_count,
+                'blockedCount': attack_count // 2, 'flaggedIPCount': 10,
+                'topAttackTypes': [{'tagName': attack['value'], 'tagCount': attack['count']}
+                                   for attack in attacks],
+                'topAttackSources': [{'countryCode': 'US', 'countryName': 'United States',
+                                      'requestCount': attack_count}]}
+
+    def _suspicious_ips(self, corp, site):
+        # drawn from a corp-wide pool, so the same IPs appear on several sites
+        rng = _random(self.data.seed, corp, site, 'suspicious')
+        return [{'source': _ip(_random(self.data.seed, corp, 'attacker', index)),
+                 'count': rng.randint(1, 1000), 'percent': rng.randint(1, 100),
+                 'issues': [rng.choice(SIGNALS)]}
+                for index in rng.sample(range(50), 10)]
+
+    def _timeseries(self, site, params):
+        tag = params.get('tag') or 'requests.total'
+        rng = _random(self.data.seed, 'timeseries', site, tag)
+        step = int(params.get('rollup') or 60)
+        until = _epoch(params.get('until'), self.data.now)
+        until -= until % step
+        start = _epoch(params.get('from'), until - 3600)
+        start -= start % step
+        return {'data': [{'type': tag, 'from': start, 'until': until, 'inc': step,
+                          'data': [rng.randint(0, 5000) for _ in range(start, until, step)],
+                          'summaryCount': 0, 'totalPoints': (until - start) // step}]}
+
+
+def main():
+    """
+    Run the stand-in server from the command line
+    """
+    parser = argparse.ArgumentParser(description='Local Signal Sciences API stand-in server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8800)
+    parser.add_argument('--sites', type=int, default=10, help='Sites per corp.')
+    parser.add_argument('--events', type=int, default=200, help='Events per site.')
+    parser.add_argument('--requests', type=int, default=5000, help='Requests per site.')
+    parser.add_argument('--agents', type=int, default=5, help='Agents per site.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to responses.')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random extra latency, seconds.')
+    parser.add_argument('--slow-rate', type=float, default=0.0,
+                        help='Fraction of responses delayed by --slow-latency.')
+    parser.add_argument('--slow-latency', type=float, default=0.0,
+                        help='Extra seconds for slow responses.')
+    parser.add_argument('--rate-limit', type=float, help='Requests per second before 429s.')
+    parser.add_argument('--error-rate', type=float, default=0.0,
+                        help='Fraction of requests that fail with a 500.')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', default=False, action='store_true')
+    args = parser.parse_args()
+
+    server = StandInServer(args.port, args.host, latency=args.latency, jitter=args.jitter,
+                           rate_limit=args.rate_limit, error_rate=args.error_rate,
+                           verbose=args.verbose, sites=args.sites, events=args.events,
+                           requests=args.requests, agents=args.agents, seed=args.seed)
+    server.slow_rate = args.slow_rate
+    server.slow_latency = args.slow_latency
+
+    print('Serving the Signal Sciences API stand-in at {}'.format(server.url))
+    print('export SIGSCI_API_URL={} SIGSCI_CORP={}'.format(server.url, DEFAULT_CORP))
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
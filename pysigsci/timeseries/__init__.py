@@ -0,0 +1,10 @@
+"""
+timeseries module
+"""
+
+from .timeseries import Timeseries
+from .timeseries import fetch
+from .timeseries import series_points
+from .timeseries import tag_series
+from .timeseries import numpy_module
+from .timeseries import ALL_SITES
@@ -0,0 +1,358 @@
+"""
+Signal Sciences Request Timeseries across Sites
+"""
+
+from array import array
+from numbers import Integral
+from multiprocessing.pool import ThreadPool
+from pysigsci.sigsciapi import response_error
+
+try:
+    array('q')
+    INT_TYPECODE = 'q'
+except ValueError:
+    INT_TYPECODE = 'l'
+
+FLOAT_TYPECODE = 'd'
+
+# site of columns summed across sites
+ALL_SITES = '*'
+
+_NUMPY = []
+
+
+def numpy_module():
+    """
+    Returns the numpy module, or None when it is not installed
+    """
+    if not _NUMPY:
+        try:
+            import numpy
+            _NUMPY.append(numpy)
+        except ImportError:
+            _NUMPY.append(None)
+
+    return _NUMPY[0]
+
+
+def series_points(series):
+    """
+    Returns (timestamps, values, step) of a timeseries API series, which holds
+    values from "from" every "inc" seconds, or [timestamp, value] pairs
+    """
+    data = series.get('data') or []
+
+    if data and isinstance(data[0], (list, tuple)):
+        timestamps = [int(point[0]) for point in data]
+        values = [point[1] or 0 for point in data]
+        step = series.get('inc') or (timestamps[1] - timestamps[0] if len(data) > 1 else 60)
+        return timestamps, values, int(step)
+
+    step = int(series.get('inc') or 60)
+    start = int(series.get('from') or 0)
+    return [start + position * step for position in range(len(data))], \
+        [value or 0 for value in data], step
+
+
+def tag_series(response, tag):
+    """
+    Returns the series of a tag in a timeseries API response, or its only series, or None
+    """
+    data = response.get('data') or []
+    matching = [item for item in data if item.get('type') == tag] or data[:1]
+    return matching[0] if matching else None
+
+
+def _integer(values):
+    # whether a numpy array, array or list holds integers
+    dtype = getattr(values, 'dtype', None)
+
+    if dtype is not None:
+        return dtype.kind in 'iu'
+
+    typecode = getattr(values, 'typecode', None)
+
+    if typecode is not None:
+        return typecode == INT_TYPECODE
+
+    return all(isinstance(value, Integral) for value in values)
+
+
+class Timeseries(object):
+    """
+    Columns of values keyed by (site, tag), aligned on one index of timestamps step
+    seconds apart. Columns are numpy arrays, or array module arrays without numpy
+    (or with use_numpy=False). Operations return new Timeseries
+    """
+
+    def __init__(self, index, step, columns, use_numpy=None, errors=None):
+        self.numpy = numpy_module() if use_numpy is not False else None
+
+        if use_numpy and self.numpy is None:
+            raise ImportError('numpy is required for use_numpy=True')
+
+        self.step = step
+        self.index = self._array(index, integer=True)
+        self.columns = dict((key, self._array(values)) for key, values in columns.items())
+        self.errors = errors or {}
+
+    def _array(self, values, integer=None):
+        if integer is None:
+            integer = _integer(values)
+
+        if self.numpy is not None:
+            return self.numpy.asarray(values, dtype='int64' if integer else 'float64')
+
+        return array(INT_TYPECODE if integer else FLOAT_TYPECODE, values)
+
+    def _derive(self, index, step, columns):
+        return Timeseries(index, step, columns, use_numpy=self.numpy is not None,
+                          errors=self.errors)
+
+    def __len__(self):
+        return len(self.index)
+
+    def __getitem__(self, key):
+        return self.columns[key]
+
+    def keys(self):
+        """
+        (site, tag) keys of the columns, sorted
+        """
+        return sorted(self.columns)
+
+    def sites(self):
+        """
+        Site names of the columns
+        """
+        return sorted(set(site for site, _ in self.columns))
+
+    def tags(self):
+        """
+        Tag names of the columns
+        """
+        return sorted(set(tag for _, tag in self.columns))
+
+    @classmethod
+    def from_series(cls, series, use_numpy=None, errors=None):
+        """
+        Align API series given as {(site, tag): series} on a common index
+        The step is the largest of the series, points of finer series are summed into it
+        and missing points are 0
+        """
+        points = dict((key, series_points(value)) for key, value in series.items())
+        points = dict((key, value) for key, value in points.items() if value[0])
+
+        if not points:
+            return cls([], 60, {}, use_numpy, errors)
+
+        step = max(value[2] for value in points.values())
+        start = min(value[0][0] for value in points.values())
+        start -= start % step
+        end = max(value[0][-1] for value in points.values())
+        length = (end - start) // step + 1
+        index = [start + position * step for position in range(length)]
+        numpy = numpy_module() if use_numpy is not False else None
+        columns = {}
+
+        for key, (timestamps, values, _) in points.items():
+            if numpy is not None:
+                positions = (numpy.asarray(timestamps, dtype='int64') - start) // step
+                column = numpy.bincount(positions, weights=numpy.asarray(values, dtype='float64'),
+                                        minlength=length)
+                columns[key] = column.astype('int64') if _integer(values) else column
+            else:
+                column = [0] * length
+
+                for timestamp, value in zip(timestamps, values):
+                    column[(timestamp - start) // step] += value
+
+                columns[key] = column
+
+        return cls(index, step, columns, use_numpy, errors)
+
+    def resample(self, step, how='sum'):
+        """
+        Combine points into step seconds, a multiple of the current step, with sum, mean or max
+        """
+        if step % self.step:
+            raise ValueError('step must be a multiple of {}'.format(self.step))
+
+        if how not in ['sum', 'mean', 'max']:
+            raise ValueError('Unknown aggregation {}'.format(how))
+
+        if not len(self.index):
+            return self._derive([], step, {})
+
+        start = self.index[0] - self.index[0] % step
+        factor = step // self.step
+        offset = (self.index[0] - start) // self.step
+        length = -(-(offset + len(self.index)) // factor)
+        index = [start + position * step for position in range(length)]
+        columns = {}
+
+        for key, values in self.columns.items():
+            if self.numpy is not None:
+                numpy = self.numpy
+                padded = numpy.zeros(length * factor, dtype=values.dtype)
+                padded[offset:offset + len(values)] = values
+                grouped = padded.reshape(length, factor)
+
+                if how == 'sum':
+                    columns[key] = grouped.sum(axis=1)
+                elif how == 'max':
+                    columns[key] = grouped.max(axis=1)
+                else:
+                    counts = numpy.full(length, factor, dtype='float64')
+                    counts[0] -= offset
+                    counts[-1] -= length * factor - offset - len(values)
+                    columns[key] = grouped.sum(axis=1) / counts
+            else:
+                groups = [[] for _ in range(length)]
+
+                for position, value in enumerate(values):
+                    groups[(offset + position) // factor].append(value)
+
+                if how == 'sum':
+                    columns[key] = [sum(group) for group in groups]
+                elif how == 'max':
+                    columns[key] = [max(group) for group in groups]
+                else:
+                    columns[key] = [float(sum(group)) / len(group) for group in groups]
+
+        return self._derive(index, step, columns)
+
+    def sum_sites(self):
+        """
+        Sum each tag across sites, into (ALL_SITES, tag) columns
+        """
+        columns = {}
+
+        for (_, tag), values in self.columns.items():
+            key = (ALL_SITES, tag)
+
+            if key not in columns:
+                columns[key] = values.copy() if self.numpy is not None else list(values)
+            elif self.numpy is not None:
+                columns[key] = columns[key] + values
+            else:
+                columns[key] = [total + value for total, value in zip(columns[key], values)]
+
+        return self._derive(self.index, self.step, columns)
+
+    def rate(self, per=1):
+        """
+        Values per per seconds, e.g. rate(60) for requests per minute
+        """
+        scale = float(per) / self.step
+        columns = {}
+
+        for key, values in self.columns.items():
+            if self.numpy is not None:
+                columns[key] = values * scale
+            else:
+                columns[key] = [value * scale for value in values]
+
+        return self._derive(self.index, self.step, columns)
+
+    def rolling(self, window, how='sum'):
+        """
+        Sum or mean of the last window points at each point, fewer at the start
+        """
+        if window < 1:
+            raise ValueError('window must be at least 1')
+
+        if how not in ['sum', 'mean']:
+            raise ValueError('Unknown aggregation {}'.format(how))
+
+        columns = {}
+
+        for key, values in self.columns.items():
+            if self.numpy is not None:
+                numpy = self.numpy
+                totals = numpy.cumsum(values)
+                totals[window:] = totals[window:] - totals[:-window]
+                counts = numpy.minimum(numpy.arange(1, len(values) + 1), window)
+                columns[key] = totals if how == 'sum' else totals / counts
+            else:
+                column = []
+                total = 0
+
+                for position, value in enumerate(values):
+                    total += value
+
+                    if position >= window:
+                        total -= values[position - window]
+
+                    column.append(total if how == 'sum' else
+                                  float(total) / min(position + 1, window))
+
+                columns[key] = column
+
+        return self._derive(self.index, self.step, columns)
+
+    def to_dict(self):
+        """
+        JSON serializable form: index, step and a list of site, tag and data columns
+        """
+        def plain(values):
+            return values.tolist()
+
+        return {
+            'step': self.step,
+            'index': plain(self.index),
+            'series': [{'site': site, 'tag': tag, 'data': plain(self.columns[(site, tag)])}
+                       for site, tag in self.keys()],
+            'errors': [{'site': site, 'tag': tag, 'error': error}
+                       for (site, tag), error in sorted(self.errors.items())]
+        }
+
+
+def fetch(sigsci, tags, sites=None, start=None, end=None, rollup=None, workers=None,
+          use_numpy=None):
+    """
+    Fetch the request timeseries of tags for sites (default all sites) concurrently,
+    one call per site and tag, and return them aligned as a Timeseries
+    start and end are passed as from and until, e.g. -1h, rollup is seconds per point.
+    Failed calls are left out and reported in the errors attribute
+    """
+    if sites is None:
+        sites = [site['name'] for site in sigsci.get_corp_sites()['data']]
+
+    parameters = dict((name, value)
+                      for name, value in [('from', start), ('until', end), ('rollup', rollup)]
+                      if value is not None)
+    keys = [(site, tag) for site in sites for tag in tags]
+    series = {}
+    errors = {}
+
+    def call(key):
+        site, tag = key
+
+        try:
+            response = sigsci.clone(site).get_timeseries_requests(dict(parameters, tag=tag))
+        except Exception as error:
+            return key, None, str(error)
+
+        return key, response, response_error(response)
+
+    if not keys:
+        return Timeseries.from_series({}, use_numpy)
+
+    pool = ThreadPool(min(workers or sigsci.workers, len(keys)))
+
+    try:
+        for key, response, error in pool.imap_unordered(call, keys):
+            if error is not None:
+                errors[key] = error
+                continue
+
+            found = tag_series(response, key[1])
+
+            if found is not None:
+                series[key] = found
+    finally:
+        pool.close()
+        pool.join()
+
+    return Timeseries.from_series(series, use_numpy, errors)
@@ -20,7 +20,15 @@ setup(
     keywords="wrapper library signal sciences sigsci pysigsci api cli",
     url="https://github.com/foospidy/pysigsci",
     download_url="https://github.com/foospidy/pysigsci",
-    packages=['pysigsci', 'pysigsci.sigsciapi', 'pysigsci.powerrules', 'pysigsci.releases'],
+    packages=['pysigsci', 'pysigsci.sigsciapi', 'pysigsci.powerrules', 'pysigsci.releases',
+              'pysigsci.audit', 'pysigsci.snapshots',
+              'pysigsci.mirror', 'pysigsci.compliance',
+              'pysigsci.ipset', 'pysigsci.bulk',
+              'pysigsci.reconcile',
+              'pysigsci.clone', 'pysigsci.batch',
+              'pysigsci.metrics', 'pysigsci.profiling',
+              'pysigsci.standin', 'pysigsci.timeseries',
+              'pysigsci.dashboard'],
     long_description=LONG_DESC,
     classifiers=[
         "Intended Audience :: Developers",
@@ -29,5 +37,6 @@ setup(
         "License :: OSI Approved :: MIT License",
     ],
     install_requires=['requests', 'pyopenssl', 'deepdiff', 'gitpython'],
+    extras_require={'http2': ['httpx[http2]'], 'numpy': ['numpy']},
     scripts=['pysigsci/bin/pysigsci', 'pysigsci/bin/pysigscia'],
 )
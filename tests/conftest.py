@@ -0,0 +1,27 @@
+"""
+Shared fixtures, tests run offline against the API stand-in
+"""
+
+import pytest
+from pysigsci.standin import StandInServer
+
+
+@pytest.fixture
+def server():
+    """
+    A stand-in API with two sites, stopped after the test
+    """
+    standin = StandInServer(sites=2, events=20, requests=100).start()
+
+    try:
+        yield standin
+    finally:
+        standin.stop()
+
+
+@pytest.fixture
+def client(server):
+    """
+    A client of the stand-in for site-0
+    """
+    return server.client()
@@ -0,0 +1,73 @@
+"""
+Bulk list operations and expiry parsing
+"""
+
+import time
+import datetime
+from pysigsci import bulk
+from pysigsci.bulk.bulk import parse_expires
+from pysigsci.sigsciapi import SigSciApi
+
+
+def test_parse_expires_utc():
+    assert parse_expires('2024-01-01T00:00:00Z') == datetime.datetime(2024, 1, 1)
+    assert parse_expires('2024-01-01T00:00:00.250Z') == \
+        datetime.datetime(2024, 1, 1, 0, 0, 0, 250000)
+    assert parse_expires('2024-01-01T00:00:00') == datetime.datetime(2024, 1, 1)
+
+
+def test_parse_expires_offsets():
+    assert parse_expires('2024-01-01T00:00:00-05:00') == datetime.datetime(2024, 1, 1, 5)
+    assert parse_expires('2024-01-01T00:00:00+05:30') == \
+        datetime.datetime(2023, 12, 31, 18, 30)
+    assert parse_expires('2024-01-01T00:00:00+0100') == datetime.datetime(2023, 12, 31, 23)
+
+
+def test_parse_expires_unset_or_invalid():
+    assert parse_expires('') is None
+    assert parse_expires(None) is None
+    assert parse_expires('tomorrow') is None
+
+
+def test_prune_expired_with_negative_offset(client):
+    client.add_blacklist({'source': '192.0.2.1', 'note': 'test',
+                          'expires': '2024-01-01T00:00:00-05:00'})
+    client.add_blacklist({'source': '192.0.2.2', 'note': 'test',
+                          'expires': '2024-01-01T10:00:00-05:00'})
+    now = datetime.datetime(2024, 1, 1, 12)
+
+    outcomes = list(bulk.prune_expired(client, 'blacklist', now=now, dry_run=True))
+
+    assert [outcome['source'] for outcome in outcomes] == ['192.0.2.1']
+
+
+def test_bulk_add_yields_in_input_order(client, monkeypatch):
+    add_blacklist = SigSciApi.add_blacklist
+
+    # later entries complete first
+    def slow_add(self, entry):
+        time.sleep(0.05 * (5 - int(entry['source'].split('.')[-1])))
+        return add_blacklist(self, entry)
+
+    monkeypatch.setattr(SigSciApi, 'add_blacklist', slow_add)
+    existing = client.get_blacklist()['data'][0]['source']
+    entries = bulk.read_list_entries(['192.0.2.1', '192.0.2.2', '192.0.2.1', existing,
+                                      '192.0.2.3', 'not-an-ip', '192.0.2.4'])
+
+    outcomes = list(bulk.bulk_add(client, 'blacklist', entries, workers=4))
+
+    assert [(outcome['source'], outcome['status']) for outcome in outcomes] == [
+        ('192.0.2.1', 'added'), ('192.0.2.2', 'added'), ('192.0.2.1', 'duplicate'),
+        (existing, 'exists'), ('192.0.2.3', 'added'), ('not-an-ip', 'error'),
+        ('192.0.2.4', 'added')]
+    assert outcomes[2]['first'] == 0
+
+
+def test_read_list_entries_formats():
+    entries = bulk.read_list_entries(['# comment', '', '10.0.0.1,office',
+                                      '{"source": "10.0.0.2", "note": "json"}', '10.0.0.3'],
+                                     note='default', expires='2030-01-01T00:00:00Z')
+
+    assert [(entry['source'], entry['note']) for entry in entries] == [
+        ('10.0.0.1', 'office'), ('10.0.0.2', 'json'), ('10.0.0.3', 'default')]
+    assert all(entry['expires'] == '2030-01-01T00:00:00Z' for entry in entries)
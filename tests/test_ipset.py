@@ -0,0 +1,62 @@
+"""
+IPSet merging, containment and overlap
+"""
+
+import pytest
+from pysigsci.ipset import IPSet
+
+
+def test_sibling_networks_merge():
+    ipset = IPSet(['10.0.0.0/25', '10.0.0.128/25'])
+    assert ipset.cidrs() == ['10.0.0.0/24']
+
+
+def test_addresses_merge_into_minimal_cidrs():
+    ipset = IPSet('192.0.2.{}'.format(index) for index in range(8))
+    assert ipset.cidrs() == ['192.0.2.0/29']
+
+
+def test_add_reports_covered_networks():
+    ipset = IPSet(['10.0.0.0/8'])
+    assert ipset.add('10.1.2.3') is False
+    assert ipset.add('11.0.0.1') is True
+    assert ipset.cidrs() == ['10.0.0.0/8', '11.0.0.1']
+
+
+def test_larger_network_replaces_contained_ones():
+    ipset = IPSet(['10.0.0.1', '10.0.0.2/31'])
+    ipset.add('10.0.0.0/24')
+    assert ipset.cidrs() == ['10.0.0.0/24']
+
+
+def test_contains_requires_full_coverage():
+    ipset = IPSet(['10.0.0.0/24'])
+    assert '10.0.0.7' in ipset
+    assert '10.0.0.0/25' in ipset
+    assert '10.0.0.0/23' not in ipset
+    assert '10.0.1.1' not in ipset
+
+
+def test_overlaps_partial_networks():
+    ipset = IPSet(['10.0.0.5'])
+    assert ipset.overlaps('10.0.0.0/24')
+    assert ipset.overlaps('10.0.0.5')
+    assert not ipset.overlaps('10.0.1.0/24')
+    assert '10.0.0.0/24' not in ipset
+
+
+def test_ipv6_is_kept_apart_from_ipv4():
+    ipset = IPSet(['2001:db8::/33', '2001:db8:8000::/33', '10.0.0.1'])
+    assert ipset.cidrs() == ['10.0.0.1', '2001:db8::/32']
+    assert '2001:db8::1' in ipset
+    assert not ipset.overlaps('2001:db9::/32')
+
+
+def test_invalid_address_raises():
+    with pytest.raises(ValueError):
+        IPSet().add('not-an-ip')
+
+
+def test_from_response_reads_list_entries():
+    response = {'data': [{'source': '10.0.0.1'}, {'source': '10.0.0.0/31'}]}
+    assert IPSet.from_response(response).cidrs() == ['10.0.0.0/31']
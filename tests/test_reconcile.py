@@ -0,0 +1,85 @@
+"""
+Reconciler plans against the stand-in
+"""
+
+from pysigsci.audit import DEFAULT_ALERTS
+from pysigsci.reconcile import Reconciler
+
+
+def rule_lists(client):
+    return client.get_site_rule_lists()['data']
+
+
+def test_matching_state_plans_nothing(client):
+    desired = [dict((field, item[field]) for field in ['name', 'type', 'description', 'entries'])
+               for item in rule_lists(client)]
+
+    for item in desired:
+        item['entries'] = list(reversed(item['entries']))
+
+    assert Reconciler({'rule-lists': desired}).plan_site(client) == []
+
+
+def test_plan_adds_and_updates(client):
+    existing = rule_lists(client)[0]
+    desired = [
+        {'name': existing['name'], 'type': 'ip', 'description': 'changed',
+         'entries': existing['entries']},
+        {'name': 'new-list', 'type': 'ip', 'description': '', 'entries': ['192.0.2.1']}
+    ]
+
+    plan = Reconciler({'rule-lists': desired}).plan_site(client)
+
+    assert [(change['action'], change['key']) for change in plan] == [
+        ('update', [existing['name']]), ('add', ['new-list'])]
+    assert plan[0]['id'] == existing['id']
+    assert plan[0]['data']['description'] == 'changed'
+    assert plan[1]['data'] == desired[1]
+
+
+def test_plan_without_prune_keeps_other_items(client):
+    assert Reconciler({'custom-alerts': []}).plan_site(client) == []
+
+
+def test_prune_skips_built_in_alerts(client):
+    alerts = client.get_site_alerts()['data']
+    plan = Reconciler({'custom-alerts': []}, prune=True).plan_site(client)
+    deleted = set(change['id'] for change in plan)
+
+    assert all(change['action'] == 'delete' for change in plan)
+    assert deleted == set(alert['id'] for alert in alerts
+                          if alert['tagName'] not in DEFAULT_ALERTS)
+    assert [alert for alert in alerts if alert['tagName'] in DEFAULT_ALERTS]
+
+
+def test_prune_deletes_references_first(client):
+    desired = {'site-signals': [], 'rule-lists': [], 'site-rules': [], 'custom-alerts': []}
+    plan = Reconciler(desired, prune=True).plan_site(client)
+    order = []
+
+    for change in plan:
+        if change['resource'] not in order:
+            order.append(change['resource'])
+
+    assert order == ['custom-alerts', 'site-rules', 'rule-lists', 'site-signals']
+
+
+def test_prune_deletes_signals_by_tag_name(client):
+    signals = client.get_site_signals()['data']
+    plan = Reconciler({'site-signals': []}, prune=True).plan_site(client)
+
+    assert sorted(change['id'] for change in plan) == \
+        sorted(signal['tagName'] for signal in signals)
+
+
+def test_reconcile_converges(server):
+    sigsci = server.client()
+    desired = {'rule-lists': [{'name': 'managed', 'type': 'ip', 'description': '',
+                               'entries': ['192.0.2.1', '192.0.2.2']}]}
+    reconciler = Reconciler(desired)
+
+    first = list(reconciler.reconcile(sigsci, sites=['site-0', 'site-1'], workers=2))
+    second = list(reconciler.reconcile(sigsci, sites=['site-0', 'site-1'], workers=2))
+
+    assert sorted(result['status'] for result in first) == ['applied', 'applied']
+    assert sorted(result['status'] for result in second) == ['converged', 'converged']
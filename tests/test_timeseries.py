@@ -0,0 +1,80 @@
+"""
+Timeseries alignment and numpy / array backend parity
+"""
+
+import pytest
+from pysigsci import timeseries
+
+numpy = pytest.importorskip('numpy')
+
+SERIES = {
+    ('www', 'SQLI'): {'type': 'SQLI', 'from': 1000, 'inc': 60, 'data': [1, 2, 3, 4, 5, 6]},
+    ('www', 'XSS'): {'type': 'XSS', 'from': 1120, 'inc': 60, 'data': [7, 0, 9]},
+    ('api', 'SQLI'): {'type': 'SQLI', 'inc': 60, 'data': [[1020, 10], [1140, 20], [1260, 30]]}
+}
+
+OPERATIONS = [
+    ('aligned', lambda series: series),
+    ('resample sum', lambda series: series.resample(300)),
+    ('resample mean', lambda series: series.resample(180, how='mean')),
+    ('resample max', lambda series: series.resample(240, how='max')),
+    ('sum sites', lambda series: series.sum_sites()),
+    ('rate', lambda series: series.rate(1)),
+    ('rolling sum', lambda series: series.rolling(3)),
+    ('rolling mean', lambda series: series.rolling(2, how='mean')),
+    ('chained', lambda series: series.sum_sites().resample(300).rolling(2).rate(60))
+]
+
+
+def backends():
+    return [timeseries.Timeseries.from_series(SERIES, use_numpy=use_numpy)
+            for use_numpy in [True, False]]
+
+
+def test_backends():
+    with_numpy, without_numpy = backends()
+    assert isinstance(with_numpy.index, numpy.ndarray)
+    assert not isinstance(without_numpy.index, numpy.ndarray)
+
+
+@pytest.mark.parametrize('name, operation', OPERATIONS, ids=[name for name, _ in OPERATIONS])
+def test_backend_parity(name, operation):
+    with_numpy, without_numpy = [operation(series).to_dict() for series in backends()]
+
+    assert with_numpy['step'] == without_numpy['step']
+    assert with_numpy['index'] == without_numpy['index']
+    assert [(item['site'], item['tag']) for item in with_numpy['series']] == \
+        [(item['site'], item['tag']) for item in without_numpy['series']]
+
+    for expected, actual in zip(with_numpy['series'], without_numpy['series']):
+        assert actual['data'] == pytest.approx(expected['data'])
+
+
+def test_alignment():
+    series = timeseries.Timeseries.from_series(SERIES, use_numpy=False)
+
+    assert series.step == 60
+    assert list(series.index) == [960 + 60 * position for position in range(6)]
+    assert list(series[('www', 'XSS')]) == [0, 0, 7, 0, 9, 0]
+    assert list(series[('api', 'SQLI')]) == [0, 10, 0, 20, 0, 30]
+
+
+def test_sum_sites_totals():
+    series = timeseries.Timeseries.from_series(SERIES, use_numpy=False).sum_sites()
+    assert list(series[(timeseries.ALL_SITES, 'SQLI')]) == [1, 12, 3, 24, 5, 36]
+
+
+def test_fetch_matches_per_site_calls(server):
+    sigsci = server.client()
+    fetched = timeseries.fetch(sigsci, ['SQLI', 'XSS'], sites=['site-0', 'site-1'],
+                               start='-1h', workers=2, use_numpy=False)
+
+    assert fetched.keys() == [('site-0', 'SQLI'), ('site-0', 'XSS'),
+                              ('site-1', 'SQLI'), ('site-1', 'XSS')]
+    assert fetched.errors == {}
+
+    for site, tag in fetched.keys():
+        response = sigsci.clone(site).get_timeseries_requests({'from': '-1h', 'tag': tag})
+        expected = timeseries.Timeseries.from_series(
+            {(site, tag): timeseries.tag_series(response, tag)}, use_numpy=False)
+        assert list(fetched[(site, tag)]) == list(expected[(site, tag)])
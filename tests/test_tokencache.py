@@ -0,0 +1,79 @@
+"""
+Token cache expiry and file permissions
+"""
+
+import os
+import json
+import stat
+import time
+import base64
+import pytest
+from pysigsci.sigsciapi.tokencache import TokenCache
+
+
+def jwt(expires):
+    """
+    An unsigned JWT with an exp claim
+    """
+    payload = base64.urlsafe_b64encode(json.dumps({'exp': expires}).encode('utf-8'))
+    return 'header.{}.signature'.format(payload.decode('utf-8').rstrip('='))
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return TokenCache(str(tmp_path / 'pysigsci' / 'tokens.json'))
+
+
+def test_token_expiry_reads_exp_claim():
+    assert TokenCache.token_expiry(jwt(1700000000)) == 1700000000.0
+    assert TokenCache.token_expiry('opaque-token') is None
+
+
+def test_valid_token_is_returned(cache):
+    token = {'token': jwt(time.time() + 3600)}
+    cache.put('user@example.com', token)
+
+    assert cache.get('user@example.com') == token
+    assert cache.get('other@example.com') is None
+
+
+def test_expired_token_is_not_returned(cache):
+    cache.put('user@example.com', {'token': jwt(time.time() - 10)})
+    assert cache.get('user@example.com') is None
+
+
+def test_token_expiring_within_a_minute_is_not_returned(cache):
+    cache.put('user@example.com', {'token': jwt(time.time() + 30)})
+    assert cache.get('user@example.com') is None
+
+
+def test_opaque_token_uses_ttl(cache, monkeypatch):
+    cache.put('user@example.com', {'token': 'opaque-token'})
+    assert cache.get('user@example.com') == {'token': 'opaque-token'}
+
+    later = time.time() + TokenCache.ttl
+    monkeypatch.setattr(time, 'time', lambda: later)
+    assert cache.get('user@example.com') is None
+
+
+def test_remove_forgets_token(cache):
+    cache.put('user@example.com', {'token': jwt(time.time() + 3600)})
+    cache.remove('user@example.com')
+    assert cache.get('user@example.com') is None
+
+
+@pytest.mark.skipif(os.name != 'posix', reason='POSIX permissions')
+def test_cache_file_is_private(cache):
+    cache.put('user@example.com', {'token': jwt(time.time() + 3600)})
+
+    assert stat.S_IMODE(os.stat(cache.path).st_mode) == 0o600
+    assert stat.S_IMODE(os.stat(os.path.dirname(cache.path)).st_mode) == 0o700
+
+
+def test_unreadable_cache_is_empty(cache):
+    os.makedirs(os.path.dirname(cache.path))
+
+    with open(cache.path, 'w') as outfile:
+        outfile.write('not json')
+
+    assert cache.get('user@example.com') is None